@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+from tf.convert.iiif import IIIF
+from tf.core.files import readJson, writeJson, writeYaml, dirMake
+
+
+FOLDERS = ("A", "B")
+PAGES = dict(A=["A001", "A002"], B=["B001"])
+COVERS = ["cover1"]
+
+IIIF_SETTINGS = dict(
+    constants=dict(server="https://example.org"),
+    macros=dict(),
+    switches=dict(prod=dict(), dev=dict()),
+    templates=dict(
+        coverItem=dict(id="«server»/covers/{page}", width="{width}"),
+        coverSequence=dict(id="«server»/manifests/{folder}"),
+        pageItem=dict(id="«server»/pages/{folder}/{page}", width="{width}"),
+        pageSequence=dict(id="«server»/manifests/{folder}"),
+    ),
+)
+
+
+def makeRepo(repoLocation):
+    """Make a minimal repository with the inputs that `IIIF` reads."""
+    dirMake(f"{repoLocation}/programs")
+    dirMake(f"{repoLocation}/report")
+    dirMake(f"{repoLocation}/scans/covers")
+    dirMake(f"{repoLocation}/scans/logo")
+    dirMake(f"{repoLocation}/thumb")
+
+    writeYaml(IIIF_SETTINGS, asFile=f"{repoLocation}/programs/iiif.yaml")
+    writeJson(PAGES, asFile=f"{repoLocation}/report/pageseq.json")
+
+    for cover in COVERS:
+        with open(f"{repoLocation}/scans/covers/{cover}.jpg", "w") as fh:
+            fh.write("")
+
+    for kind, names in (("covers", COVERS), ("pages", sum(PAGES.values(), []))):
+        with open(f"{repoLocation}/thumb/sizes_{kind}.tsv", "w") as fh:
+            fh.write("file\twidth\theight\n")
+            for i, name in enumerate(names):
+                fh.write(f"{name}\t{100 + i}\t{200 + i}\n")
+
+
+def makeApp(repoLocation):
+    """Make a stand-in for a loaded TF app with a `folder` node per folder."""
+    nodes = {i + 1: folder for (i, folder) in enumerate(FOLDERS)}
+    F = SimpleNamespace(
+        folder=SimpleNamespace(v=nodes.get),
+        otype=SimpleNamespace(s=lambda tp: tuple(nodes) if tp == "folder" else ()),
+    )
+    return SimpleNamespace(
+        api=SimpleNamespace(F=F),
+        repoLocation=repoLocation,
+        context=SimpleNamespace(provenanceSpec=dict(graphicsRelative="thumb")),
+    )
+
+
+def test_init_with_folders(tmp_path):
+    repoLocation = str(tmp_path)
+    makeRepo(repoLocation)
+
+    iiif = IIIF("", makeApp(repoLocation), silent=True)
+
+    assert iiif.folders == list(FOLDERS)
+    assert iiif.pages["pages"] == PAGES
+    assert iiif.pages["covers"] == dict(covers=[f"{c}.jpg" for c in COVERS])
+
+
+def readManifests(manifestDir):
+    return {
+        name: readJson(asFile=f"{manifestDir}/{name}.json", plain=True)
+        for name in ("covers", *FOLDERS)
+    }
+
+
+def test_manifests(tmp_path):
+    repoLocation = str(tmp_path)
+    makeRepo(repoLocation)
+
+    iiif = IIIF("", makeApp(repoLocation), silent=True)
+    iiif.manifests()
+    sequential = readManifests(iiif.manifestDir)
+
+    assert [item["id"] for item in sequential["A"]["items"]] == [
+        "https://example.org/pages/A/A001",
+        "https://example.org/pages/A/A002",
+    ]
+    assert sequential["B"]["items"] == [
+        dict(id="https://example.org/pages/B/B001", width=102)
+    ]
+
+    iiif.manifests(workers=2)
+    assert readManifests(iiif.manifestDir) == sequential
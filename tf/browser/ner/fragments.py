@@ -151,14 +151,16 @@ class Fragments:
 
     def wrapQuery(self):
         """HTML for all control widgets on the page."""
+        setData = self.ner.getSetData()
+
         self.wrapAppearance()
-        self.wrapFilter()
+        self.wrapFilter(setData)
         self.wrapEntity()
         self.wrapEntityText()
         self.wrapScope()
-        self.wrapEntityFeats()
+        self.wrapEntityFeats(setData)
         self.wrapEntityModReport()
-        self.wrapEntityModify()
+        self.wrapEntityModify(setData)
 
     def wrapAppearance(self):
         """HTML for the appearance widget.
@@ -219,16 +221,19 @@ class Fragments:
             sep=" ",
         )
 
-    def wrapFilter(self):
+    def wrapFilter(self, setData):
         """HTML for the filter widget.
 
         The filter widget lets the user filter the buckets by a search pattern
         or the condition that the buckets contains entities (and the even more useful
         condition that the buckets do *not* contain entities).
+
+        Parameters
+        ----------
+        setData: dict
+            The data of the current annotation set.
         """
         v = self.v
-        ner = self.ner
-        setData = ner.getSetData()
 
         bFind = v.bfind
         bFindC = v.bfindc
@@ -497,12 +502,17 @@ class Fragments:
             )
         )
 
-    def wrapEntityFeats(self):
+    def wrapEntityFeats(self, setData):
         """HTML for the entity feature value selection.
 
         All feature values of entities that occupy the selected occurrences are
         shown, with the possibility that the user selects some of these values,
         thereby selecting a subset of the original set of occurrences.
+
+        Parameters
+        ----------
+        setData: dict
+            The data of the current annotation set.
         """
         v = self.v
         ner = self.ner
@@ -511,8 +521,6 @@ class Fragments:
         bucketType = settings.bucketType
         features = settings.features
 
-        setData = ner.getSetData()
-
         txt = v.txt
         eTxt = v.etxt
         valSelect = v.valselect
@@ -663,7 +671,7 @@ class Fragments:
 
         return scopeExceptions
 
-    def wrapEntityModify(self):
+    def wrapEntityModify(self, setData):
         """HTML for the add / del widget.
 
         This widget contains controls to specify which entity feature values
@@ -671,6 +679,11 @@ class Fragments:
 
         Considerable effort is made to prefill these components with ergonomic
         values.
+
+        Parameters
+        ----------
+        setData: dict
+            The data of the current annotation set.
         """
         v = self.v
         ner = self.ner
@@ -680,7 +693,6 @@ class Fragments:
 
         featureDefault = ner.featureDefault
 
-        setData = ner.getSetData()
         setIsRo = ner.setIsRo
 
         txt = v.txt
@@ -210,6 +210,33 @@ def findCompile(bFind, bFindC):
     return (bFind, bFindRe, errorMsg)
 
 
+PROP_MAP = dict(
+    ff="font-family",
+    fz="font-size",
+    fw="font-weight",
+    fg="color",
+    bg="background-color",
+    bw="border-width",
+    bs="border-style",
+    bc="border-color",
+    br="border-radius",
+    p="padding",
+    m="margin",
+)
+"""Abbreviations of CSS properties as used in `tf.browser.ner.settings.STYLES`."""
+
+PROP_FMT = {abb: f"\t{prop}: {{}};\n" for (abb, prop) in PROP_MAP.items()}
+
+CSS_BLOCKS = {
+    manner: "".join(PROP_FMT[abb].format(val) for (abb, val) in props.items())
+    for (manner, props) in STYLES.items()
+}
+"""CSS property blocks for each manner in `tf.browser.ner.settings.STYLES`.
+
+They do not depend on the corpus, so we compute them once, on import.
+"""
+
+
 def makeCss(features, keywordFeatures):
     """Generates CSS for the tool.
 
@@ -223,25 +250,6 @@ def makeCss(features, keywordFeatures):
         What the features are and what the keyword features are.
         These derive ultimately from the corpus-dependent `ner/config.yaml`.
     """
-    propMap = dict(
-        ff="font-family",
-        fz="font-size",
-        fw="font-weight",
-        fg="color",
-        bg="background-color",
-        bw="border-width",
-        bs="border-style",
-        bc="border-color",
-        br="border-radius",
-        p="padding",
-        m="margin",
-    )
-
-    def makeBlock(manner):
-        props = STYLES[manner]
-        defs = [f"\t{propMap[abb]}: {val};\n" for (abb, val) in props.items()]
-        return H.join(defs)
-
     def makeCssDef(selector, *blocks):
         return selector + " {\n" + H.join(blocks) + "}\n"
 
@@ -250,10 +258,10 @@ def makeCss(features, keywordFeatures):
     for feat in features:
         manner = "keyword" if feat in keywordFeatures else "free"
 
-        plain = makeBlock(manner)
-        bordered = makeBlock(f"{manner}_bordered")
-        active = makeBlock(f"{manner}_active")
-        borderedActive = makeBlock(f"{manner}_bordered_active")
+        plain = CSS_BLOCKS[manner]
+        bordered = CSS_BLOCKS[f"{manner}_bordered"]
+        active = CSS_BLOCKS[f"{manner}_active"]
+        borderedActive = CSS_BLOCKS[f"{manner}_bordered_active"]
 
         css.extend(
             [
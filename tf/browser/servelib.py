@@ -10,19 +10,74 @@ TF browser infrastructure, such as
 *   `tf.browser.start`
 """
 
-from io import BytesIO
+from functools import lru_cache
+from io import BytesIO, TextIOWrapper
 from zipfile import ZipFile
 
 from flask import request
 
+from ..capable import CheckImport
 from ..parameters import ZIP_OPTIONS
 from ..core.files import writeJson
 
+CI = CheckImport("orjson", optional=True)
+if CI.importOK(hint=False):
+    orjson = CI.importGet()
+else:
+    orjson = None
 
 DEFAULT_NAME = "default"
 
 BATCH = 20
 
+ZIP_OPTIONS_JOB = {**ZIP_OPTIONS, "compresslevel": 1}
+"""Options for zip when packing the results of a job for download.
+
+The zip file is made while the user waits, and the tables in it are very
+compressible, so we choose speed over the last bit of compression.
+"""
+
+FORM_FIELDS = (
+    ("query", "cr"),
+    ("messages", ""),
+    ("features", ""),
+    ("tuples", "cr"),
+    ("sections", "cr"),
+    ("appName", ""),
+    ("side", ""),
+    ("dstate", ""),
+    ("metaopen", ""),
+    ("author", "strip"),
+    ("title", "strip"),
+    ("description", "cr"),
+    ("forceEdges", "none"),
+    ("hideTypes", "none"),
+    ("condensed", ""),
+    ("baseTypes", "list"),
+    ("hiddenTypes", "list"),
+    ("edgeFeatures", "list"),
+    ("condenseType", ""),
+    ("textFormat", ""),
+    ("sectionsExpandAll", ""),
+    ("tuplesExpandAll", ""),
+    ("queryExpandAll", ""),
+    ("passageOpened", ""),
+    ("sectionsOpened", ""),
+    ("tuplesOpened", ""),
+    ("queryOpened", ""),
+)
+"""Form fields with a fixed name, and how their values are peeled out of the form.
+
+*   `""`: the value as string, empty if missing;
+*   `strip`: the value as string, stripped from surrounding white space;
+*   `cr`: the value as string, with carriage returns removed;
+*   `none`: the value as string, or None if missing;
+*   `list`: all values of the field, as a tuple.
+"""
+
+SECTION_FIELDS = ("sec0", "sec1", "sec2", "s0filter")
+"""Form fields for the section selection, all of them plain strings."""
+
 
 def getInt(x, default=1):
     if len(x) > 15:
@@ -32,6 +87,16 @@ def getInt(x, default=1):
     return int(x)
 
 
+@lru_cache(maxsize=256)
+def getEdgeEnd(x):
+    """Interpret the value of a from or to field of an edge highlight.
+
+    Returns 0 for the empty string, None for `any`, the number for a
+    decimal string, and 0 for anything else.
+    """
+    return 0 if x == "" else None if x == "any" else int(x) if x.isdecimal() else 0
+
+
 def batchAround(nResults, position, batch):
     halfBatch = int((batch + 1) / 2)
     left = min(max(position - halfBatch, 1), nResults)
@@ -59,9 +124,14 @@ def getFormData(interfaceDefaults):
     but there is also a list of web app dependent options.
     """
 
+    # we look up the methods of the form once, not for every field
+
+    get = request.form.get
+    getlist = request.form.getlist
+
     form = {}
-    jobName = request.form.get("jobName", "").strip()
-    resetForm = request.form.get("resetForm", "")
+    jobName = get("jobName", "").strip()
+    resetForm = get("resetForm", "")
     form["resetForm"] = resetForm
 
     if jobName:
@@ -72,43 +142,28 @@ def getFormData(interfaceDefaults):
         form["loadJob"] = "1"
         form["resetForm"] = "1"
 
-    form["query"] = request.form.get("query", "").replace("\r", "")
-    form["messages"] = request.form.get("messages", "") or ""
-    form["features"] = request.form.get("features", "") or ""
-    form["tuples"] = request.form.get("tuples", "").replace("\r", "")
-    form["sections"] = request.form.get("sections", "").replace("\r", "")
-    form["appName"] = request.form.get("appName", "")
-    form["side"] = request.form.get("side", "")
-    form["dstate"] = request.form.get("dstate", "")
-    form["metaopen"] = request.form.get("metaopen", "")
-    form["author"] = request.form.get("author", "").strip()
-    form["title"] = request.form.get("title", "").strip()
-    form["description"] = request.form.get("description", "").replace("\r", "")
-    form["forceEdges"] = request.form.get("forceEdges", None)
-    form["hideTypes"] = request.form.get("hideTypes", None)
-    form["condensed"] = request.form.get("condensed", "")
-    form["baseTypes"] = tuple(request.form.getlist("baseTypes"))
-    form["hiddenTypes"] = tuple(request.form.getlist("hiddenTypes"))
-    form["edgeFeatures"] = tuple(request.form.getlist("edgeFeatures"))
-    form["condenseType"] = request.form.get("condenseType", "")
-    form["textFormat"] = request.form.get("textFormat", "")
-    form["sectionsExpandAll"] = request.form.get("sectionsExpandAll", "")
-    form["tuplesExpandAll"] = request.form.get("tuplesExpandAll", "")
-    form["queryExpandAll"] = request.form.get("queryExpandAll", "")
-    form["passageOpened"] = request.form.get("passageOpened", "")
-    form["sectionsOpened"] = request.form.get("sectionsOpened", "")
-    form["tuplesOpened"] = request.form.get("tuplesOpened", "")
-    form["queryOpened"] = request.form.get("queryOpened", "")
-    form["mode"] = request.form.get("mode", "") or "passage"
-    form["position"] = getInt(request.form.get("position", ""), default=1)
-    form["batch"] = getInt(request.form.get("batch", ""), default=BATCH)
-    form["sec0"] = request.form.get("sec0", "")
-    form["sec1"] = request.form.get("sec1", "")
-    form["sec2"] = request.form.get("sec2", "")
-    form["s0filter"] = request.form.get("s0filter", "")
+    for (k, kind) in FORM_FIELDS:
+        form[k] = (
+            get(k, "")
+            if kind == ""
+            else get(k, "").replace("\r", "")
+            if kind == "cr"
+            else get(k, "").strip()
+            if kind == "strip"
+            else get(k, None)
+            if kind == "none"
+            else tuple(getlist(k))
+        )
+
+    form["mode"] = get("mode", "") or "passage"
+    form["position"] = getInt(get("position", ""), default=1)
+    form["batch"] = getInt(get("batch", ""), default=BATCH)
+
+    for k in SECTION_FIELDS:
+        form[k] = get(k, "")
 
     for k in ["colormapn", "ecolormapn"]:
-        form[k] = request.form.get(k, "")
+        form[k] = get(k, "")
     colorMapN = getInt(form["colormapn"], default=0)
     eColorMapN = getInt(form["ecolormapn"], default=0)
 
@@ -116,7 +171,7 @@ def getFormData(interfaceDefaults):
 
     for i in range(1, colorMapN + 1):
         colorKey = f"colormap_{i}"
-        form[colorKey] = request.form.get(colorKey, "")
+        form[colorKey] = get(colorKey, "")
         color = form[colorKey]
         colorMap[i] = color
 
@@ -126,31 +181,15 @@ def getFormData(interfaceDefaults):
 
     for i in range(1, eColorMapN + 1):
         for k in [f"ecolormap_{i}", f"edge_name_{i}", f"edge_from_{i}", f"edge_to_{i}"]:
-            form[k] = request.form.get(k, "")
+            form[k] = get(k, "")
         color = form[f"ecolormap_{i}"]
         name = form[f"edge_name_{i}"]
         fRep = form[f"edge_from_{i}"]
         tRep = form[f"edge_to_{i}"]
         if name == "" or fRep == "" or tRep == "":
             continue
-        f = (
-            0
-            if fRep == ""
-            else None
-            if fRep == "any"
-            else int(fRep)
-            if fRep.isdecimal()
-            else 0
-        )
-        t = (
-            0
-            if tRep == ""
-            else None
-            if tRep == "any"
-            else int(tRep)
-            if tRep.isdecimal()
-            else 0
-        )
+        f = getEdgeEnd(fRep)
+        t = getEdgeEnd(tRep)
         edgeHighlights.setdefault(name, {})[(f, t)] = color
 
     for i in range(1, 4):
@@ -160,30 +199,14 @@ def getFormData(interfaceDefaults):
             f"edge_from_new_{i}",
             f"edge_to_new_{i}",
         ]:
-            form[k] = request.form.get(k, "")
+            form[k] = get(k, "")
         color = form[f"ecolormap_new_{i}"]
         name = form[f"edge_name_new_{i}"]
         fRep = form[f"edge_from_new_{i}"]
         tRep = form[f"edge_to_new_{i}"]
         if name != "" and fRep != "" and tRep != "":
-            f = (
-                0
-                if fRep == ""
-                else None
-                if fRep == "any"
-                else int(fRep)
-                if fRep.isdecimal()
-                else 0
-            )
-            t = (
-                0
-                if tRep == ""
-                else None
-                if tRep == "any"
-                else int(tRep)
-                if tRep.isdecimal()
-                else 0
-            )
+            f = getEdgeEnd(fRep)
+            t = getEdgeEnd(tRep)
             edgeHighlights.setdefault(name, {})[(f, t)] = color
 
     form["edgeHighlights"] = edgeHighlights
@@ -191,7 +214,7 @@ def getFormData(interfaceDefaults):
     for (k, v) in interfaceDefaults.items():
         if v is None:
             continue
-        form[k] = request.form.get(k, None)
+        form[k] = get(k, None)
     return form
 
 
@@ -236,27 +259,43 @@ def zipTables(csvs, tupleResultsX, queryResultsX, about, form):
     jobName = form["jobName"]
 
     zipBuffer = BytesIO()
-    with ZipFile(zipBuffer, "w", **ZIP_OPTIONS) as zipFile:
-
-        zipFile.writestr("job.json", writeJson(form).encode("utf8"))
-        zipFile.writestr("job.json", writeJson.dumps(
-            {k: v for (k, v) in form.items() if k not in {"edgeHighlights", "colorMap"}}
-        ).encode("utf8"))
+    with ZipFile(zipBuffer, "w", **ZIP_OPTIONS_JOB) as zipFile:
+
+        # the highlight maps have non-string keys, they do not go into the job file
+
+        job = {
+            k: v for (k, v) in form.items() if k not in {"edgeHighlights", "colorMap"}
+        }
+        zipFile.writestr(
+            "job.json",
+            orjson.dumps(job, option=orjson.OPT_INDENT_2)
+            if orjson
+            else writeJson(job).encode("utf8"),
+        )
         zipFile.writestr("about.md", about)
         if csvs is not None:
+            # we stream the rows into the zip file, so that we never hold
+            # a complete table in memory, neither as string nor as bytes
+
             for (csv, data) in csvs:
-                contents = "".join(
-                    ("\t".join(str(t) for t in tup) + "\n") for tup in data
-                )
-                zipFile.writestr(f"{csv}.tsv", contents.encode("utf8"))
+                with TextIOWrapper(
+                    zipFile.open(f"{csv}.tsv", "w"), encoding="utf8", newline=""
+                ) as fh:
+                    fh.writelines(
+                        "\t".join(str(t) for t in tup) + "\n" for tup in data
+                    )
             for (name, data) in (
                 ("nodesx.tsv", tupleResultsX),
                 ("resultsx.tsv", queryResultsX),
             ):
                 if data is not None:
-                    contents = "\ufeff" + "".join(
-                        ("\t".join("" if t is None else str(t) for t in tup) + "\n")
-                        for tup in data
-                    )
-                    zipFile.writestr(name, contents.encode("utf_16_le"))
+                    with TextIOWrapper(
+                        zipFile.open(name, "w"), encoding="utf_16_le", newline=""
+                    ) as fh:
+                        fh.write("\ufeff")
+                        fh.writelines(
+                            "\t".join("" if t is None else str(t) for t in tup)
+                            + "\n"
+                            for tup in data
+                        )
     return (f"{appName}-{jobName}.zip", zipBuffer.getvalue())
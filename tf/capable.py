@@ -79,6 +79,7 @@ INCIDENTAL_DEPS = dict(
     spacyd=("spacy.cli.download", "spacy"),
     pagexml=("pagexml.parser", "pagexml-tools"),
     marimo=("marimo", "marimo"),
+    orjson=("orjson", "orjson"),
 )
 """The incidendtal dependencies of TF.
 
@@ -208,6 +208,12 @@ NUMBER_RE = re.compile(
     re.X,
 )
 
+BLOCK_RE = re.compile(
+    r"«begin(Model|Slot|Token|Parent|Sibling|Extra|Procins)([^»]+)»(.*?)«end\1\2»",
+    re.S,
+)
+PLACEHOLDER_RE = re.compile(r"«([^»]+)»")
+
 W_BEFORE = re.compile(r"""^\s+""")
 W_AFTER = re.compile(r"""\s+$""")
 
@@ -298,25 +304,29 @@ def checkModel(kind, thisModel, verbose):
     if verbose >= 0:
         console(f"{kind} model is {model}")
 
-    properties = {k: v for (k, v) in thisModel.items() if k != "model"}
     modelProperties = modelSpecs[model]
 
     good = True
-    delKeys = []
+    properties = {}
+
+    for k, v in thisModel.items():
+        if k == "model":
+            continue
 
-    for k, v in properties.items():
-        if k not in modelProperties:
+        spec = modelProperties.get(k, None)
+
+        if spec is None:
             console(f"WARNING: ignoring unknown {kind} model property {k}={v}")
-            delKeys.append(k)
-        elif type(v) is not modelProperties[k][0]:
+            continue
+
+        if type(v) is not spec[0]:
             console(
-                f"ERROR: {kind} property {k} should have type {modelProperties[k][0]}"
+                f"ERROR: {kind} property {k} should have type {spec[0]}"
                 f" but {v} has type {type(v)}"
             )
             good = False
-    if good:
-        for k in delKeys:
-            del properties[k]
+
+        properties[k] = v
 
     for k, v in modelProperties.items():
         if k not in properties:
@@ -462,91 +472,75 @@ def tweakTrans(
     else:
         doProcins = "No"
 
-    levelNames = sectionProperties["levels"]
-
     if sectionModel == "II":
         nLevels = "2"
-        chapterSection = levelNames[0]
-        chunkSection = levelNames[1]
+        (chapterSection, chunkSection) = sectionProperties["levels"]
         head = sectionProperties["element"]
         attributes = sectionProperties["attributes"]
-        propertiesRaw = repr(sectionProperties)
+        propertiesRaw = (
+            repr(sectionProperties) if "«propertiesRaw»" in template else ""
+        )
         properties = (
-            "".join(
-                f"\t*\t`{att}` = `{val}`\n" for (att, val) in sorted(attributes.items())
+            (
+                "".join(
+                    f"\t*\t`{att}` = `{val}`\n"
+                    for (att, val) in sorted(attributes.items())
+                )
+                if attributes
+                else "\t*\t*no attribute properties*\n"
             )
-            if attributes
-            else "\t*\t*no attribute properties*\n"
+            if "«properties»" in template
+            else ""
         )
     else:
         nLevels = "3"
-        folderSection = levelNames[0]
-        fileSection = levelNames[1]
-        chunkSection = levelNames[2]
+        (folderSection, fileSection, chunkSection) = sectionProperties["levels"]
 
-    rendDescStr = "\n".join(
-        f"`{val}` | {desc}" for (val, desc) in sorted(rendDesc.items())
+    rendDescStr = (
+        "\n".join(f"`{val}` | {desc}" for (val, desc) in sorted(rendDesc.items()))
+        if "«rendDesc»" in template
+        else ""
     )
-    modelKeepRe = re.compile(rf"«(?:begin|end)Model{sectionModel}»")
-    modelRemoveRe = re.compile(r"«beginModel([^»]+)».*?«endModel\1»", re.S)
-    slotKeepRe = re.compile(rf"«(?:begin|end)Slot{slot}»")
-    slotRemoveRe = re.compile(r"«beginSlot([^»]+)».*?«endSlot\1»", re.S)
-    tokenKeepRe = re.compile(rf"«(?:begin|end)Token{hasToken}»")
-    tokenRemoveRe = re.compile(r"«beginToken([^»]+)».*?«endToken\1»", re.S)
-    parentKeepRe = re.compile(rf"«(?:begin|end)Parent{hasParent}»")
-    parentRemoveRe = re.compile(r"«beginParent([^»]+)».*?«endParent\1»", re.S)
-    siblingKeepRe = re.compile(rf"«(?:begin|end)Sibling{hasSibling}»")
-    siblingRemoveRe = re.compile(r"«beginSibling([^»]+)».*?«endSibling\1»", re.S)
-    extraKeepRe = re.compile(rf"«(?:begin|end)Extra{hasExtra}»")
-    extraRemoveRe = re.compile(r"«beginExtra([^»]+)».*?«endToken\1»", re.S)
-    procinsKeepRe = re.compile(rf"«(?:begin|end)Procins{doProcins}»")
-    procinsRemoveRe = re.compile(r"«beginProcins([^»]+)».*?«endToken\1»", re.S)
-
-    skipVars = re.compile(r"«[^»]+»")
-
-    text = (
-        template.replace("«slot»", slot)
-        .replace("«Slot»", slotc)
-        .replace("«slotf»", slotf)
-        .replace("«char and word»", xslot)
-        .replace("«tokenWord»", tokenWord)
-        .replace("«token generation»", tokenGen)
-        .replace("«nLevels»", nLevels)
-        .replace("«sectionModel»", sectionModel)
-        .replace("«rendDesc»", rendDescStr)
-        .replace("«extraFeatures»", extra)
+
+    keep = dict(
+        Model=sectionModel,
+        Slot=slot,
+        Token=hasToken,
+        Parent=hasParent,
+        Sibling=hasSibling,
+        Extra=hasExtra,
+        Procins=doProcins,
     )
+
+    def keepOrDrop(match):
+        (kind, value, body) = match.group(1, 2, 3)
+        return BLOCK_RE.sub(keepOrDrop, body) if keep[kind] == value else ""
+
+    subs = {
+        "slot": slot,
+        "Slot": slotc,
+        "slotf": slotf,
+        "char and word": xslot,
+        "tokenWord": tokenWord,
+        "token generation": tokenGen,
+        "nLevels": nLevels,
+        "sectionModel": sectionModel,
+        "rendDesc": rendDescStr,
+        "extraFeatures": extra,
+        "chunk": chunkSection,
+    }
     if sectionModel == "II":
-        text = (
-            text.replace("«head»", head)
-            .replace("«properties»", properties)
-            .replace("«propertiesRaw»", propertiesRaw)
-            .replace("«chapter»", chapterSection)
-            .replace("«chunk»", chunkSection)
+        subs.update(
+            head=head,
+            properties=properties,
+            propertiesRaw=propertiesRaw,
+            chapter=chapterSection,
         )
     else:
-        text = (
-            text.replace("«folder»", folderSection)
-            .replace("«file»", fileSection)
-            .replace("«chunk»", chunkSection)
-        )
+        subs.update(folder=folderSection, file=fileSection)
 
-    text = parentKeepRe.sub("", text)
-    text = parentRemoveRe.sub("", text)
-    text = siblingKeepRe.sub("", text)
-    text = siblingRemoveRe.sub("", text)
-    text = tokenKeepRe.sub("", text)
-    text = tokenRemoveRe.sub("", text)
-    text = modelKeepRe.sub("", text)
-    text = modelRemoveRe.sub("", text)
-    text = slotKeepRe.sub("", text)
-    text = slotRemoveRe.sub("", text)
-    text = extraKeepRe.sub("", text)
-    text = extraRemoveRe.sub("", text)
-    text = procinsKeepRe.sub("", text)
-    text = procinsRemoveRe.sub("", text)
-
-    text = skipVars.sub("", text)
+    text = BLOCK_RE.sub(keepOrDrop, template)
+    text = PLACEHOLDER_RE.sub(lambda match: subs.get(match.group(1), ""), text)
 
     if extra:
         text += dedent(
@@ -778,3 +772,37 @@ def fillinIIIF(data, **kwargs):
         return {k: fillinIIIF(v, **kwargs) for (k, v) in data.items()}
 
     return data
+
+
+def compileIIIF(data):
+    """Prepare a template for repeated filling in.
+
+    The template is walked once, and the parts that do not contain
+    any `{`*name*`}` placeholders are set aside as constants.
+
+    Parameters
+    ----------
+    data: object
+        A template as accepted by `fillinIIIF`.
+
+    Returns
+    -------
+    function
+        It accepts the same keyword arguments as `fillinIIIF` and delivers
+        the same result as `fillinIIIF` on the original template.
+    """
+    tpd = type(data)
+
+    if tpd is str:
+        if "{" in data:
+            return lambda **kwargs: fillinIIIF(data, **kwargs)
+
+    elif tpd is list:
+        fillers = [compileIIIF(item) for item in data]
+        return lambda **kwargs: [fill(**kwargs) for fill in fillers]
+
+    elif tpd is dict:
+        fillers = [(k, compileIIIF(v)) for (k, v) in data.items()]
+        return lambda **kwargs: {k: fill(**kwargs) for (k, fill) in fillers}
+
+    return lambda **kwargs: data
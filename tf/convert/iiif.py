@@ -1,18 +1,152 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+
 from ..core.files import (
+    mTime,
+    fileExists,
     readYaml,
     readJson,
-    writeJson,
     fileOpen,
     initTree,
     dirExists,
     dirCopy,
     dirContents,
 )
+from ..capable import CheckImport
 from ..core.helpers import console
-from .helpers import parseIIIF, fillinIIIF
+from .helpers import parseIIIF, fillinIIIF, compileIIIF
 
 DS_STORE = ".DS_Store"
 
+CI = CheckImport("orjson", optional=True)
+if CI.importOK(hint=False):
+    orjson = CI.importGet()
+else:
+    orjson = None
+
+NO_SIZE = (0, 0)
+"""Width and height of pages for which no size is known."""
+
+HIDDEN_FILES = frozenset({DS_STORE, "Thumbs.db"})
+"""Files that operating systems leave in directories and that are not scans."""
+
+
+@lru_cache(maxsize=8)
+def _loadTemplates(yamlFile, modified, prod):
+    """Reads and parses the IIIF templates.
+
+    The result is cached per file, modification time and production mode,
+    so that the same settings are not parsed anew for every `IIIF` object.
+    """
+    settings = readYaml(asFile=yamlFile, plain=True)
+    return parseIIIF(settings, prod, "templates")
+
+
+@lru_cache(maxsize=8)
+def _loadPageSeq(pageSeqFile, modified):
+    """Reads the page sequence.
+
+    The result is cached per file and modification time.
+    """
+    return readJson(asFile=pageSeqFile, plain=True)
+
+
+def sizeStats(values):
+    """Computes the maximum, average and average deviation of a list of sizes.
+
+    The sum and maximum are computed by builtin reductions instead of
+    by bookkeeping in the loop that reads the sizes.
+    """
+    n = len(values)
+    av = int(round(sum(values) / n))
+    dev = int(round(sum(abs(v - av) for v in values) / n))
+    return (max(values), av, dev)
+
+
+def writeManifest(header, items, asFile):
+    """Writes a manifest to file, item by item.
+
+    The manifest is the header with the items added under the key `items`,
+    written as compact JSON, without indentation and without spaces after the
+    separators. The items do not have to be collected in memory first.
+
+    If the module `orjson` is installed, we use it to serialize the data,
+    otherwise the standard library; the result is the same, byte for byte.
+
+    Parameters
+    ----------
+    header: dict
+        The keys and values of the manifest, except the items.
+    items: iterable
+        The items of the manifest.
+    asFile: string
+        The file to write the manifest to.
+    """
+    dumps = (
+        orjson.dumps
+        if orjson is not None
+        else lambda data: json.dumps(
+            data, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf8")
+    )
+
+    with fileOpen(asFile, mode="wb") as fh:
+        fh.write(b"{")
+
+        for k, v in header.items():
+            fh.write(dumps(k) + b":" + dumps(v) + b",")
+
+        fh.write(b'"items":[')
+        sep = b""
+
+        for item in items:
+            fh.write(sep + dumps(item))
+            sep = b","
+
+        fh.write(b"]}")
+
+
+def genManifest(folder, thesePages, sizeInfo, pageItem, pageSequence, manifestDir):
+    """Generates the manifest of a single folder.
+
+    This is a module-level function, so that the manifests of several folders
+    can be generated in parallel worker processes.
+
+    Parameters
+    ----------
+    folder: string
+        The name of the folder.
+    thesePages: iterable
+        The pages in the folder.
+    sizeInfo: dict
+        The width and height of the pages, keyed by page.
+    pageItem, pageSequence: dict
+        The templates for the page items and for the manifest as a whole.
+    manifestDir: string
+        The directory to write the manifest to.
+    """
+    fillers = tuple(
+        (k, compileIIIF(fillinIIIF(v, folder=folder))) for (k, v) in pageItem.items()
+    )
+
+    def genItems():
+        getSize = sizeInfo.get
+
+        for p in thesePages:
+            w, h = getSize(p, NO_SIZE)
+            yield {k: fill(page=p, width=w, height=h) for (k, fill) in fillers}
+
+    data = {}
+
+    for k, v in pageSequence.items():
+        v = fillinIIIF(v, folder=folder)
+        data[k] = v
+
+    writeManifest(data, genItems(), f"{manifestDir}/{folder}.json")
+
 
 class IIIF:
     def __init__(self, teiVersion, app, prod=False, silent=False):
@@ -41,22 +175,25 @@ class IIIF:
         self.logoDir = f"{staticDir}/logo"
         self.reportDir = f"{repoLocation}/report{teiVersionRep}"
 
-        settings = readYaml(asFile=f"{repoLocation}/programs/iiif.yaml", plain=True)
-        self.templates = parseIIIF(settings, prod, "templates")
+        yamlFile = f"{repoLocation}/programs/iiif.yaml"
+        modified = mTime(yamlFile) if fileExists(yamlFile) else None
+        self.templates = _loadTemplates(yamlFile, modified, prod)
 
         self.getSizes()
+        self.covers = sorted(
+            f
+            for f in dirContents(coversDir)[0]
+            if f not in HIDDEN_FILES and not f.startswith(".")
+        )
         self.getPageSeq()
-        pages = self.pages
-        covers = sorted(f for f in dirContents(coversDir)[0] if f is not DS_STORE)
-        self.covers = covers
+        pages = self.pages["pages"]
         folders = [F.folder.v(f) for f in F.otype.s("folder")]
         self.folders = folders
 
-        self.console("Collections:")
-
-        for folder in folders:
-            n = len(pages[folder])
-            self.console(f"{folder:>5} with {n:>4} pages")
+        lines = ["Collections:"] + [
+            f"{folder:>5} with {len(pages[folder]):>4} pages" for folder in folders
+        ]
+        self.console("\n".join(lines))
 
     def console(self, msg, **kwargs):
         """Print something to the output.
@@ -83,37 +220,17 @@ class IIIF:
             sizeInfo = {}
             self.sizeInfo[kind] = sizeInfo
 
-            maxW, maxH = 0, 0
-
-            n = 0
+            with fileOpen(sizeFile, newline="") as rh:
+                reader = csv.reader(rh, delimiter="\t", quoting=csv.QUOTE_NONE)
+                next(reader)
+                rows = list(reader)
 
-            totW, totH = 0, 0
+            ws = [int(row[1]) for row in rows]
+            hs = [int(row[2]) for row in rows]
+            sizeInfo.update(zip((row[0] for row in rows), zip(ws, hs)))
 
-            ws, hs = [], []
-
-            with fileOpen(sizeFile) as rh:
-                next(rh)
-                for line in rh:
-                    fields = line.rstrip("\n").split("\t")
-                    p = fields[0]
-                    (w, h) = (int(x) for x in fields[1:3])
-                    sizeInfo[p] = (w, h)
-                    ws.append(w)
-                    hs.append(h)
-                    n += 1
-                    totW += w
-                    totH += h
-
-                    if w > maxW:
-                        maxW = w
-                    if h > maxH:
-                        maxH = h
-
-            avW = int(round(totW / n))
-            avH = int(round(totH / n))
-
-            devW = int(round(sum(abs(w - avW) for w in ws) / n))
-            devH = int(round(sum(abs(h - avH) for h in hs) / n))
+            (maxW, avW, devW) = sizeStats(ws)
+            (maxH, avH, devH) = sizeStats(hs)
 
             self.console(f"Maximum dimensions: W = {maxW:>4} H = {maxH:>4}")
             self.console(f"Average dimensions: W = {avW:>4} H = {avH:>4}")
@@ -125,48 +242,55 @@ class IIIF:
         pageSeqFile = f"{reportDir}/pageseq.json"
 
         self.pages = {}
+        modified = mTime(pageSeqFile) if fileExists(pageSeqFile) else None
         self.pages = dict(
-            pages=readJson(asFile=pageSeqFile, plain=True), covers=dict(covers=covers)
+            pages=_loadPageSeq(pageSeqFile, modified), covers=dict(covers=covers)
         )
 
-    def genPages(self, kind, folder=None):
-        if kind == "covers":
-            folder = kind
+    def genCovers(self):
+        """Generates the manifest of the covers."""
         templates = self.templates
-        sizeInfo = self.sizeInfo[kind]
-        pages = self.pages[kind]
-        thesePages = pages[folder]
-
-        pageItem = templates.coverItem if kind == "covers" else templates.pageItem
-
-        items = []
-
-        for p in thesePages:
-            item = {}
-            w, h = sizeInfo.get(p, (0, 0))
-
-            for k, v in pageItem.items():
-                v = fillinIIIF(v, folder=folder, page=p, width=w, height=h)
-                item[k] = v
-
-            items.append(item)
-
-        pageSequence = (
-            templates.coverSequence if kind == "covers" else templates.pageSequence
+        self._genOne(
+            "covers",
+            self.pages["covers"]["covers"],
+            self.sizeInfo["covers"],
+            templates.coverItem,
+            templates.coverSequence,
         )
-        manifestDir = self.manifestDir
 
-        data = {}
+    def genFolder(self, folder):
+        """Generates the manifest of the pages in a single folder.
 
-        for k, v in pageSequence.items():
-            v = fillinIIIF(v, folder=folder)
-            data[k] = v
+        Parameters
+        ----------
+        folder: string
+            The name of the folder.
+        """
+        templates = self.templates
+        self._genOne(
+            folder,
+            self.pages["pages"][folder],
+            self.sizeInfo["pages"],
+            templates.pageItem,
+            templates.pageSequence,
+        )
 
-        data["items"] = items
+    def _genOne(self, folder, thesePages, sizeInfo, pageItem, pageSequence):
+        genManifest(
+            folder, thesePages, sizeInfo, pageItem, pageSequence, self.manifestDir
+        )
 
-        writeJson(data, asFile=f"{manifestDir}/{folder}.json")
+    def manifests(self, workers=1):
+        """Generates the manifests of the covers and of all folders.
 
-    def manifests(self):
+        Parameters
+        ----------
+        workers: integer, optional 1
+            The maximum number of worker processes for the folder manifests.
+            If None or 1, the manifests are generated one after another in this
+            process. Otherwise they are generated in parallel by a pool of that many
+            worker processes, which only pays off for many and large folders.
+        """
         folders = self.folders
         manifestDir = self.manifestDir
         logoInDir = self.logoInDir
@@ -174,10 +298,33 @@ class IIIF:
 
         initTree(manifestDir, fresh=True)
 
-        self.genPages("covers")
+        self.genCovers()
 
-        for folder in folders:
-            self.genPages("pages", folder=folder)
+        if workers is None or workers <= 1:
+            for folder in folders:
+                self.genFolder(folder)
+        else:
+            templates = self.templates
+            sizeInfo = self.sizeInfo["pages"]
+            pages = self.pages["pages"]
+            folderPages = [pages[folder] for folder in folders]
+            folderSizes = [
+                {p: sizeInfo[p] for p in thesePages if p in sizeInfo}
+                for thesePages in folderPages
+            ]
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(
+                    executor.map(
+                        genManifest,
+                        folders,
+                        folderPages,
+                        folderSizes,
+                        repeat(templates.pageItem),
+                        repeat(templates.pageSequence),
+                        repeat(manifestDir),
+                    )
+                )
 
         if dirExists(logoInDir):
             dirCopy(logoInDir, logoDir)
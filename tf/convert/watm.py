@@ -537,8 +537,16 @@ I am aware of the following:
 """
 
 import collections
+import json
 import re
-
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from hashlib import blake2b
+from itertools import chain, repeat
+from sys import intern
+
+from ..capable import CheckImport
 from ..core.helpers import console
 from ..core.files import (
     fileOpen,
@@ -548,7 +556,6 @@ from ..core.files import (
     fileExists,
     readYaml,
     readJson,
-    writeJson,
     backendRep,
     APP_CONFIG,
 )
@@ -619,8 +626,35 @@ KIND_ANNO = "anno"
 
 REL_RE = re.compile(r"""^(.*?)/tf\b(.*)$""")
 
+TARGET_RE = re.compile(r"""^([0-9]+):([0-9]+)(?:-(?:([0-9]+):)?([0-9]+))?$""")
+"""Parses a target into text number and position, and optionally end text and end.
+
+Targets without `:` are annotation ids and do not match.
+"""
+
 TR_SEP_LEVEL = 1
 
+EMPTY = ""
+"""The value of slots without material, shared by all of them."""
+
+AID_FMT = "a%08d"
+"""Format of annotation ids: the letter `a` and the zero-padded annotation number."""
+
+ANNO_CHUNK = 1000
+"""Number of annotations that are serialized in one go when writing anno files."""
+
+WRITE_WORKERS = 4
+"""Number of threads that write the text and annotation files concurrently."""
+
+SEGMENT_CHUNK = 10000
+"""Number of segments that are serialized in one go when writing text files."""
+
+CI = CheckImport("orjson", optional=True)
+if CI.importOK(hint=False):
+    orjson = CI.importGet()
+else:
+    orjson = None
+
 
 def rep(status):
     """Represent a boolean status for a message to the console.
@@ -636,6 +670,178 @@ def rep(status):
     return "OK" if status else "XX"
 
 
+def textDigest(parts):
+    """Compute the length and a digest of a text that is divided into parts.
+
+    The text is hashed part by part, so we never need the complete text as one
+    string in memory.
+
+    Parameters
+    ----------
+    parts: iterable
+        The parts of the text, each part is a list of strings (segments).
+
+    Returns
+    -------
+    tuple
+        The length of the complete text and its digest.
+    """
+    h = blake2b()
+    length = 0
+
+    for segments in parts:
+        part = "".join(segments)
+        length += len(part)
+        h.update(part.encode("utf8"))
+
+    return (length, h.digest())
+
+
+def textSample(parts, size=20):
+    """Show the beginning and end of a text that is divided into parts.
+
+    Parameters
+    ----------
+    parts: list
+        The parts of the text, each part is a list of strings (segments).
+    size: integer, optional 20
+        The number of characters to show at the beginning and at the end.
+
+    Returns
+    -------
+    string
+    """
+    head = ""
+
+    for segment in chain.from_iterable(parts):
+        head += segment
+
+        if len(head) >= size:
+            break
+
+    tail = ""
+
+    for segment in chain.from_iterable(reversed(p) for p in reversed(parts)):
+        tail = segment + tail
+
+        if len(tail) >= size:
+            break
+
+    return f"{head[0:size]} ... {tail[-size:]}".replace("\n", " ")
+
+
+def toJson(data):
+    """Serialize data as JSON.
+
+    If the module `orjson` is installed, we use it, because it is much faster
+    than the standard library for the large amounts of data in WATM files.
+    Either way the result is compact JSON, without spaces after the separators,
+    so that the files are identical byte for byte, whatever is installed.
+
+    Parameters
+    ----------
+    data: object
+        The data to serialize.
+
+    Returns
+    -------
+    bytes
+        The UTF-8 encoded JSON text.
+    """
+    return (
+        json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf8")
+        if orjson is None
+        else orjson.dumps(data)
+    )
+
+
+def fromJson(asFile):
+    """Read data from a JSON file.
+
+    If the module `orjson` is installed, we use it, for the same reason as in
+    `toJson`. Otherwise we fall back on `tf.core.files.readJson`.
+
+    Parameters
+    ----------
+    asFile: string
+        The path of the file to read.
+
+    Returns
+    -------
+    object
+        The data, as plain Python dicts and lists.
+    """
+    if orjson is None:
+        return readJson(asFile=asFile, plain=True)
+
+    with fileOpen(asFile, mode="rb") as fh:
+        return orjson.loads(fh.read())
+
+
+def dumpText(text, asFile):
+    """Write the segments of a text as a JSON object.
+
+    The object has a single key, `_ordered_segments`, whose value is the list of
+    segments. We write the enclosing object ourselves and serialize the segments
+    in chunks of `SEGMENT_CHUNK`, so that we do not have to build a big JSON
+    string in memory.
+
+    Parameters
+    ----------
+    text: list
+        The segments of the text.
+    asFile: string
+        The path of the file to write to.
+    """
+    with fileOpen(asFile, mode="wb") as fh:
+        fh.write(b'{"_ordered_segments": [')
+        sep = b"\n"
+
+        for start in range(0, len(text), SEGMENT_CHUNK):
+            # strip the brackets of the chunk, we write the enclosing ones
+            fh.write(sep + toJson(text[start : start + SEGMENT_CHUNK])[1:-1])
+            sep = b",\n"
+
+        fh.write(b"\n]}")
+
+
+def dumpAnnos(batch, asFile):
+    """Write a batch of annotations as a JSON object.
+
+    The annotations are serialized in chunks of `ANNO_CHUNK` entries, which are
+    written to the file one by one, so that we do not have to build a big
+    dictionary or a big JSON string in memory.
+    Each entry is keyed by its annotation id and has the kind, namespace, body
+    and target as values.
+
+    Parameters
+    ----------
+    batch: iterable
+        The annotations, as tuples (i, kind, ns, body, target), where `i` is the
+        position of the annotation, from which its id is derived.
+    asFile: string
+        The path of the file to write to.
+    """
+    with fileOpen(asFile, mode="wb") as fh:
+        fh.write(b"{")
+        sep = b"\n"
+        chunk = {}
+
+        for i, kind, ns, body, target in batch:
+            chunk[AID_FMT % i] = (kind, ns, body, target)
+
+            if len(chunk) >= ANNO_CHUNK:
+                # strip the braces of the chunk, we write the enclosing ones
+                fh.write(sep + toJson(chunk)[1:-1])
+                sep = b",\n"
+                chunk = {}
+
+        if chunk:
+            fh.write(sep + toJson(chunk)[1:-1])
+
+        fh.write(b"\n}")
+
+
 def getResultDir(baseDir, headPart, version, prod, silent):
     """Determines the directory for the resulting WATM.
 
@@ -738,9 +944,92 @@ def getResultDir(baseDir, headPart, version, prod, silent):
     return resultVersionDir
 
 
+class NodeTargets(dict):
+    """The targets of single nodes, where those of slots are made on demand.
+
+    Non-slot nodes are mapped to the ids of their annotations from the start.
+    The target of a slot is only formatted when it is asked for the first time,
+    and then it is remembered. Nodes without a target are mapped to None.
+    """
+
+    def __init__(self, slotTi, slotPos, nodeTargets):
+        super().__init__(nodeTargets)
+        self.slotTi = slotTi
+        self.slotPos = slotPos
+        self.maxSlotPlus = len(slotPos)
+
+    def __missing__(self, n):
+        target = None
+
+        if n < self.maxSlotPlus:
+            pos = self.slotPos[n]
+
+            if pos >= 0:
+                target = f"{self.slotTi[n]}:{pos}"
+
+        self[n] = target
+        return target
+
+
 class WATM:
     """The export machinery is exposed as a class, wrapped around a TF dataset."""
 
+    # instances have a fixed set of attributes, which are accessed in tight loops
+    __slots__ = (
+        "afterv",
+        "app",
+        "asTsv",
+        "bodies",
+        "cfg",
+        "E",
+        "Eall",
+        "edgeFeatures",
+        "emptyv",
+        "eoslots",
+        "error",
+        "Es",
+        "excludeElements",
+        "excludeFeatures",
+        "extra",
+        "F",
+        "Fall",
+        "fotypev",
+        "Fs",
+        "info",
+        "is_metav",
+        "kinds",
+        "L",
+        "maxNodePlus",
+        "maxSlotPlus",
+        "metaNodes",
+        "nodeFeatures",
+        "nodeFromAid",
+        "nsOrig",
+        "nss",
+        "otypes",
+        "prod",
+        "rafterv",
+        "repoLocation",
+        "resultDir",
+        "rstrv",
+        "scanInfo",
+        "silent",
+        "skipMeta",
+        "slotPos",
+        "slotTi",
+        "slotType",
+        "strv",
+        "targets",
+        "testAnnotations",
+        "testNodes",
+        "testTokens",
+        "textRepoType",
+        "texts",
+        "valCache",
+        "waFromTF",
+        "waSlotTF",
+    )
+
     def __init__(self, app, nsOrig, skipMeta=False, extra={}, silent=False, prod=False):
         """Wrap the WATM exporter around a TF dataset.
 
@@ -880,6 +1169,16 @@ class WATM:
 
         self.skipMeta = skipMeta
 
+        # the nodes to skip, looked up as a set instead of calling is_meta every time
+        self.metaNodes = (
+            frozenset(n for (n, v) in F.is_meta.items() if v)
+            if skipMeta
+            else frozenset()
+        )
+
+        # the string values of features, filled when the tests need them
+        self.valCache = {}
+
     def console(self, msg, **kwargs):
         """Print something to the output.
 
@@ -897,7 +1196,9 @@ class WATM:
 
         The text is a list of tokens and will be stored in member `text` in this object.
         Additionally, the mapping from slot numbers in the TF data
-        to indices in this list is stored in member `waFromTF`.
+        to indices in this list is stored in the members `slotTi` and `slotPos`.
+        These are arrays indexed by slot, holding the number of the text and the
+        position in that text respectively; skipped slots have -1 in them.
         """
         error = self.error
 
@@ -916,46 +1217,71 @@ class WATM:
         rstrv = self.rstrv
         afterv = self.afterv
         rafterv = self.rafterv
-        is_metav = self.is_metav
+        metaNodes = self.metaNodes
+        maxSlotPlus = self.maxSlotPlus
 
         texts = []
-        waFromTF = {}
+        slotTi = array("l", [-1]) * maxSlotPlus
+        slotPos = array("l", [-1]) * maxSlotPlus
 
         self.texts = texts
-        self.waFromTF = waFromTF
+        self.slotTi = slotTi
+        self.slotPos = slotPos
 
-        for ti, sNode in enumerate(F.otype.s(textRepoType)):
-            text = []
-            texts.append(text)
+        # we decide once which features are present,
+        # so that we do not have to test that for every slot
 
-            for s in L.d(sNode, otype=slotType):
-                if skipMeta and is_metav(s):
-                    continue
+        def getter(first, second):
+            if first and second:
 
-                after = rafterv(s) if rafterv else None
+                def get(s):
+                    v = first(s)
 
-                if after is None:
-                    after = afterv(s) if afterv else None
+                    if v is None:
+                        v = second(s)
 
-                if after is None:
-                    after = ""
+                    return EMPTY if v is None else v
 
-                if emptyv and emptyv(s):
-                    value = after
-                else:
-                    string = rstrv(s) if rstrv else None
+            elif first or second:
+                only = first or second
+
+                def get(s):
+                    v = only(s)
+                    return EMPTY if v is None else v
+
+            else:
+
+                def get(s):
+                    return EMPTY
+
+            return get
+
+        getAfter = getter(rafterv, afterv)
+        getString = getter(rstrv, strv)
+
+        if emptyv:
+
+            def getValue(s):
+                after = getAfter(s)
+                return after if emptyv(s) else f"{getString(s)}{after}"
 
-                    if string is None:
-                        string = strv(s) if strv else None
+        else:
+
+            def getValue(s):
+                return f"{getString(s)}{getAfter(s)}"
 
-                    if string is None:
-                        string = ""
+        for ti, sNode in enumerate(F.otype.s(textRepoType)):
+            slots = L.d(sNode, otype=slotType)
 
-                    value = f"{string}{after}"
+            if skipMeta:
+                slots = [s for s in slots if s not in metaNodes]
+
+            text = [getValue(s) for s in slots]
+            texts.append(text)
 
-                text.append(value)
-                t = len(text) - 1
-                waFromTF[s] = (ti, t)
+            for t, s in enumerate(slots):
+                slotTi[s] = ti
+                slotPos[s] = t
 
     def mkAnno(self, kind, ns, body, target):
         """Make a single annotation and return its id.
@@ -971,21 +1297,24 @@ class WATM:
         target: string  or tuple of strings
             The target of the annotation.
         """
-        annos = self.annos
-        aId = f"a{len(annos):>08}"
-        annos.append((kind, aId, ns, body, target))
+        kinds = self.kinds
+        aId = AID_FMT % len(kinds)
+        kinds.append(kind)
+        self.nss.append(ns)
+        self.bodies.append(body)
+        self.targets.append(target)
         return aId
 
     def makeAnno(self):
         """Make all annotations.
 
-        The annotations are stored in a big list, in member `anno` of this object.
+        The annotations are stored column-wise in the lists `kinds`, `nss`, `bodies`
+        and `targets`, which are members of this object. The id of an annotation is
+        derived from its position in these lists.
 
-        The mapping from slots to indices in the list of tokens is now extended
-        with the mapping from nodes to corresponding node annotations.
-
-        So member `waFromTF` is now a full mapping from all nodes in TF to
-        tokens and/or annotations in WATM.
+        The mapping from slots to indices in the list of tokens is now complemented
+        with the mapping from nodes to corresponding node annotations, which is
+        stored in member `waFromTF`.
         """
         error = self.error
 
@@ -997,7 +1326,6 @@ class WATM:
         Es = self.Es
         F = self.F
         Fs = self.Fs
-        fotypev = self.fotypev
         eoslots = self.eoslots
         nodeFeatures = self.nodeFeatures
         edgeFeatures = self.edgeFeatures
@@ -1010,64 +1338,81 @@ class WATM:
         excludeFeatures = self.excludeFeatures
         scanInfo = self.scanInfo
 
-        waFromTF = self.waFromTF
+        slotTi = self.slotTi
+        slotPos = self.slotPos
+        waFromTF = {}
+        self.waFromTF = waFromTF
 
-        is_metav = self.is_metav
+        metaNodes = self.metaNodes
 
         isTei = nsOrig == NS_TEI
 
-        annos = []
         texts = self.texts
-        self.annos = annos
+        kinds = []
+        nss = []
+        bodies = []
+        targets = []
+        self.kinds = kinds
+        self.nss = nss
+        self.bodies = bodies
+        self.targets = targets
+
+        # in the loops below we do the work of `mkAnno` inline
+
+        addKind = kinds.append
+        addNs = nss.append
+        addBody = bodies.append
+        addTarget = targets.append
 
         invertedTargets = []
         farTargets = []
         discontinuousNodes = collections.defaultdict(list)
 
-        def mkSingleTarget(n):
-            ts = waFromTF[n]
-            return f"{ts[0]}:{ts[1]}" if fotypev(n) == slotType else ts
-
         for otype in otypes:
             if otype == slotType or otype in excludeElements:
                 continue
 
             nodes = F.otype.s(otype)
 
+            (kind, ns, body) = (
+                (KIND_PI, nsOrig, otype[1:])
+                if otype.startswith("?")
+                else (KIND_ELEM, NS_FROM_OTYPE.get(otype, nsOrig), otype)
+            )
+
             for n in nodes:
                 ws = eoslots(n)
                 sb, se = (ws[0], ws[-1])
                 if len(ws) != se - sb + 1:
                     discontinuousNodes[otype].append(n)
 
-                if skipMeta and (is_metav(ws[0]) or is_metav(ws[-1])):
+                if skipMeta and (sb in metaNodes or se in metaNodes):
                     continue
 
-                ti0, start = waFromTF[ws[0]]
-                ti1, end = waFromTF[ws[-1]]
+                ti0 = slotTi[sb]
+                ti1 = slotTi[se]
+                start = slotPos[sb]
+                end = slotPos[se]
 
-                if ti0 != ti1:
-                    farTargets.append((otype, ti0, start, ti1, end))
+                # one test per case and the target in a single format operation
 
-                if ti0 == ti1 and end < start:
-                    invertedTargets.append((otype, ti0, start, end))
-                    start, end = (end, start)
+                if ti0 == ti1:
+                    if end < start:
+                        invertedTargets.append((otype, ti0, start, end))
+                        start, end = (end, start)
 
-                startPoint = f"{ti0}:{start}"
-                endPoint = (
-                    ("" if start == end else f"-{end + 1}")
-                    if ti0 == ti1
-                    else f"-{ti1}:{end + 1}"
-                )
-                target = f"{startPoint}{endPoint}"
-                aId = (
-                    self.mkAnno(KIND_PI, nsOrig, otype[1:], target)
-                    if otype.startswith("?")
-                    else self.mkAnno(
-                        KIND_ELEM, NS_FROM_OTYPE.get(otype, nsOrig), otype, target
+                    target = (
+                        f"{ti0}:{start}" if start == end else f"{ti0}:{start}-{end + 1}"
                     )
-                )
-                waFromTF[n] = aId
+                else:
+                    farTargets.append((otype, ti0, start, ti1, end))
+                    target = f"{ti0}:{start}-{ti1}:{end + 1}"
+
+                waFromTF[n] = AID_FMT % len(kinds)
+                addKind(kind)
+                addNs(ns)
+                addBody(body)
+                addTarget(target)
 
             if otype in scanInfo:
                 lastI = len(nodes) - 1
@@ -1089,9 +1434,37 @@ class WATM:
                         val = value.format(**values)
 
                         self.mkAnno(
-                            KIND_ATTR, NS_TV, f"{extraFeat}={val}", mkSingleTarget(n)
+                            KIND_ATTR, NS_TV, f"{extraFeat}={val}", waFromTF[n]
                         )
 
+        # the target of a single node is needed over and over again,
+        # so we compute it at most once for every node
+
+        targetStr = NodeTargets(slotTi, slotPos, waFromTF)
+
+        # whether a node can be the target of a feature annotation:
+        # one byte per node, which is cheaper to test than dict or set membership;
+        # skipped meta nodes are not targeted
+
+        targetable = bytearray(self.maxNodePlus)
+
+        for s, pos in enumerate(slotPos):
+            if pos >= 0:
+                targetable[s] = 1
+
+        for n in waFromTF:
+            targetable[n] = 1
+
+        if skipMeta:
+            for n in metaNodes:
+                targetable[n] = 0
+
+        # classify the node features before we generate their annotations:
+        # formatting features (rend_xxx and is_note in TEI) get a fixed body,
+        # the other features give attribute annotations
+
+        featSpecs = []
+
         for feat in nodeFeatures:
             if feat in excludeFeatures:
                 continue
@@ -1106,29 +1479,43 @@ class WATM:
                 )
                 ns = NS_NONE
 
-            isRend = False
-            isNote = False
+            body = None
 
             if isTei:
                 parts = feat.split("_", 2)
-                isRend = len(parts) >= 2 and parts[0] == "rend"
-                isNote = len(parts) == 2 and parts[0] == "is" and parts[1] == "note"
-
-            if isRend or isNote:
-                body = parts[1] if isRend else "note"
-
-                for n, val in Fs(feat).items():
-                    if n not in waFromTF or not val or skipMeta and is_metav(n):
-                        continue
 
-                    self.mkAnno(KIND_FMT, ns, body, mkSingleTarget(n))
+                if len(parts) >= 2 and parts[0] == "rend":
+                    body = parts[1]
+                elif len(parts) == 2 and parts[0] == "is" and parts[1] == "note":
+                    body = "note"
+
+            featSpecs.append((feat, ns, body))
+
+        # each feature gives a run of annotations with the same kind and namespace,
+        # so we select its nodes in one pass and extend the columns in one go
+
+        for feat, ns, body in featSpecs:
+            if body is None:
+                kind = KIND_ATTR
+                prefix = f"{feat}="
+                theseItems = [
+                    (n, val)
+                    for (n, val) in Fs(feat).items()
+                    if val is not None and targetable[n]
+                ]
+                theseBodies = [f"{prefix}{val}" for (n, val) in theseItems]
             else:
-                for n, val in Fs(feat).items():
-                    if n not in waFromTF or val is None or skipMeta and is_metav(n):
-                        continue
-
-                    body = f"{feat}={val}"
-                    self.mkAnno(KIND_ATTR, ns, body, mkSingleTarget(n))
+                kind = KIND_FMT
+                theseItems = [
+                    (n, val) for (n, val) in Fs(feat).items() if val and targetable[n]
+                ]
+                theseBodies = repeat(body, len(theseItems))
+
+            nItems = len(theseItems)
+            kinds.extend(repeat(kind, nItems))
+            nss.extend(repeat(ns, nItems))
+            bodies.extend(theseBodies)
+            targets.extend(targetStr[n] for (n, val) in theseItems)
 
         for feat in edgeFeatures:
             if feat in excludeFeatures:
@@ -1144,33 +1531,44 @@ class WATM:
                 )
                 ns = NS_NONE
 
+            prefix = f"{feat}="
+
             for fromNode, toNodes in Es(feat).items():
-                if fromNode not in waFromTF or skipMeta and is_metav(fromNode):
+                if not targetable[fromNode]:
                     continue
 
-                targetFrom = mkSingleTarget(fromNode)
+                targetFrom = f"{targetStr[fromNode]}->"
 
                 if type(toNodes) is dict:
                     for toNode, val in toNodes.items():
-                        if toNode not in waFromTF or skipMeta and is_metav(toNode):
+                        if not targetable[toNode]:
                             continue
 
-                        body = f"{feat}={val}"
-                        targetTo = mkSingleTarget(toNode)
-                        target = f"{targetFrom}->{targetTo}"
-                        self.mkAnno(KIND_EDGE, ns, body, target)
+                        addKind(KIND_EDGE)
+                        addNs(ns)
+                        addBody(f"{prefix}{val}")
+                        addTarget(f"{targetFrom}{targetStr[toNode]}")
                 else:
                     for toNode in toNodes:
-                        if toNode not in waFromTF or skipMeta and is_metav(toNode):
+                        if not targetable[toNode]:
                             continue
 
-                        targetTo = mkSingleTarget(toNode)
-                        target = f"{targetFrom}->{targetTo}"
-                        self.mkAnno(KIND_EDGE, ns, feat, target)
+                        addKind(KIND_EDGE)
+                        addNs(ns)
+                        addBody(feat)
+                        addTarget(f"{targetFrom}{targetStr[toNode]}")
 
         for feat, featData in extra.items():
+            prefix = f"{feat}="
+
             for n, value in featData.items():
-                self.mkAnno(KIND_ANNO, NS_TT, f"{feat}={value}", mkSingleTarget(n))
+                target = targetStr[n]
+
+                if target is not None:
+                    addKind(KIND_ANNO)
+                    addNs(NS_TT)
+                    addBody(f"{prefix}{value}")
+                    addTarget(target)
 
         if len(invertedTargets):
             self.console(f"WARNING: inverted targets, {len(invertedTargets)}x")
@@ -1212,7 +1610,7 @@ class WATM:
         When the annotation data grows larger than a certain threshold, it will be
         divided over several files.
 
-        The annotations are sorted by annotation id.
+        The annotations are sorted by annotation id and streamed to disk in batches.
 
         Parameters
         ----------
@@ -1237,7 +1635,12 @@ class WATM:
         prod = self.prod
         app = self.app
         texts = self.texts
-        annos = self.annos
+        kinds = self.kinds
+        nss = self.nss
+        bodies = self.bodies
+        targets = self.targets
+        slotTi = self.slotTi
+        slotPos = self.slotPos
         waFromTF = self.waFromTF
         asTsv = self.asTsv
 
@@ -1263,103 +1666,100 @@ class WATM:
 
         initTree(resultDir, fresh=True)
 
-        total = 0
-
         ext = "tsv" if asTsv else "json"
 
-        j = 0
-        cr = ""
-        nl = True
-
-        for i, text in enumerate(texts):
-            j += 1
-            if j > PROGRESS_LIMIT:
-                cr = "\r"
-                nl = False
-
+        def writeText(i):
+            text = texts[i]
             textFile = f"{resultDir}/text-{i}.{ext}"
-            nText = len(text)
-            total += nText
 
-            with fileOpen(textFile, "w") as fh:
-                if asTsv:
+            if asTsv:
+                with fileOpen(textFile, "w") as fh:
                     fh.write("token\n")
                     for t in text:
                         fh.write(t.replace("\t", "\\t").replace("\n", "\\n") + "\n")
-                else:
-                    writeJson(dict(_ordered_segments=text), asFile=fh)
-
-            self.console(
-                f"{cr}Text file {i:>4}: {nText:>8} segments to {textFile}",
-                newline=nl,
+            else:
+                dumpText(text, textFile)
+
+            return (textFile, len(text))
+
+        def writeAnnos(k, start, end):
+            annoFile = f"{resultDir}/anno-{k:>01}.{ext}"
+            batch = zip(
+                range(start, end),
+                kinds[start:end],
+                nss[start:end],
+                bodies[start:end],
+                targets[start:end],
             )
 
-        nTexts = len(texts)
-        sep = "" if nTexts == 1 else "s"
+            if asTsv:
+                with fileOpen(annoFile, "w") as fh:
+                    fh.write("annoid\tkind\tnamespace\tbody\ttarget\n")
+                    for i, kind, namespace, body, target in batch:
+                        aId = AID_FMT % i
+                        body = body.replace("\t", "\\t").replace("\n", "\\n")
+                        fh.write(f"{aId}\t{kind}\t{namespace}\t{body}\t{target}\n")
+            else:
+                dumpAnnos(batch, annoFile)
 
-        self.console("")
-        self.console(f"Text files all: {total:>8} segments to {nTexts} file{sep}")
+            return (annoFile, end - start)
 
-        # annotation files
+        # the annotations are already in annotation id order, since `mkAnno`
+        # derives the ids from their positions in the lists
 
-        annoStore = {}
+        nAnnos = len(kinds)
 
-        for kind, aId, ns, body, target in annos:
-            annoStore[aId] = (kind, ns, body, target)
+        LIMIT = 400000
 
-        aIdSorted = sorted(annoStore.keys())
+        # the files are written concurrently, the reporting is done in order
 
-        thisAnnoStore = {}
-        thisA = 1
-        nAnnoFiles = 0
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+            textJobs = [pool.submit(writeText, i) for i in range(len(texts))]
+            annoJobs = [
+                pool.submit(writeAnnos, k, start, min((start + LIMIT, nAnnos)))
+                for (k, start) in enumerate(range(0, nAnnos, LIMIT), start=1)
+            ]
 
-        LIMIT = 400000
-        j = 0
-        total = 0
+            total = 0
+            cr = ""
+            nl = True
 
-        def writeThis():
-            annoFile = f"{resultDir}/anno-{thisA:>01}.{ext}"
+            for i, job in enumerate(textJobs):
+                if i >= PROGRESS_LIMIT:
+                    cr = "\r"
+                    nl = False
 
-            with fileOpen(annoFile, "w") as fh:
-                if asTsv:
-                    fh.write("annoid\tkind\tnamespace\tbody\ttarget\n")
-                    for aId, (kind, namespace, body, target) in thisAnnoStore.items():
-                        body = body.replace("\t", "\\t").replace("\n", "\\n")
-                        fh.write(f"{aId}\t{kind}\t{namespace}\t{body}\t{target}\n")
-                else:
-                    writeJson(thisAnnoStore, asFile=fh)
+                (textFile, nText) = job.result()
+                total += nText
 
-            self.console(
-                f"Anno file {thisA:>4}: {j:>8} annotations written to {annoFile}"
-            )
+                self.console(
+                    f"{cr}Text file {i:>4}: {nText:>8} segments to {textFile}",
+                    newline=nl,
+                )
 
-        for aId in aIdSorted:
-            if j >= LIMIT:
-                writeThis()
-                nAnnoFiles += 1
-                thisA += 1
-                thisAnnoStore = {}
-                total += j
-                j = 0
+            nTexts = len(texts)
+            sep = "" if nTexts == 1 else "s"
+
+            self.console("")
+            self.console(f"Text files all: {total:>8} segments to {nTexts} file{sep}")
 
-            thisAnnoStore[aId] = annoStore[aId]
-            j += 1
+            total = 0
+
+            for k, job in enumerate(annoJobs, start=1):
+                (annoFile, j) = job.result()
+                total += j
 
-        if len(thisAnnoStore):
-            writeThis()
-            nAnnoFiles += 1
-            total += j
+                self.console(
+                    f"Anno file {k:>4}: {j:>8} annotations written to {annoFile}"
+                )
 
-        if len(annoStore) != total:
-            console(f"Sum of batches : {total:>8}", error=True)
-            console(f"All annotations: {len(annoStore):>8}", error=True)
-            console("Mismatch in number of annotations", error=True)
+            nAnnoFiles = len(annoJobs)
 
-        sep = "" if nAnnoFiles == 1 else "s"
+            sep = "" if nAnnoFiles == 1 else "s"
 
-        self.console(
-            f"Anno files all: {total:>8} annotations to {nAnnoFiles} file{sep}"
-        )
+            self.console(
+                f"Anno files all: {total:>8} annotations to {nAnnoFiles} file{sep}"
+            )
 
         # node mapping files
 
@@ -1369,8 +1769,11 @@ class WATM:
         with fileOpen(slotmapFile, "w") as fh:
             fh.write("position\tnode\n")
             for n in range(1, maxSlotPlus):
-                (file, pos) = waFromTF[n]
-                fh.write(f"{file}:{pos}\t{n}\n")
+                pos = slotPos[n]
+
+                # skipped meta slots do not have a position
+                if pos >= 0:
+                    fh.write(f"{slotTi[n]}:{pos}\t{n}\n")
 
         with fileOpen(nodemapFile, "w") as fh:
             fh.write("annotation\tnode\n")
@@ -1427,32 +1830,35 @@ class WATM:
         """
         different = False
 
-        for i, cTF in enumerate(tf):
-            if i >= len(wa):
-                contextI = max((0, i - 10))
-                console(f"\tWA {i}: {wa[contextI:i]} <END>", error=True)
-                console(f"\tTF {i}: {tf[contextI:i]} <> {tf[i:i + 10]}", error=True)
-                different = True
-                break
-            elif tf[i] != wa[i]:
+        # we only scan character by character to locate a difference
+
+        if tf != wa:
+            for i, cTF in enumerate(tf):
+                if i >= len(wa):
+                    contextI = max((0, i - 10))
+                    console(f"\tWA {i}: {wa[contextI:i]} <END>", error=True)
+                    console(f"\tTF {i}: {tf[contextI:i]} <> {tf[i:i + 10]}", error=True)
+                    different = True
+                    break
+                elif tf[i] != wa[i]:
+                    contextI = max((0, i - 10))
+                    console(
+                        f"\tWA {i}: {wa[contextI:i]} <{wa[i]}> {wa[i + 1:i + 11]}",
+                        error=True,
+                    )
+                    console(
+                        f"\tTF {i}: {tf[contextI:i]} <{tf[i]}> {tf[i + 1:i + 11]}",
+                        error=True,
+                    )
+                    different = True
+                    break
+
+            if not different and len(wa) > len(tf):
+                i = len(tf)
                 contextI = max((0, i - 10))
-                console(
-                    f"\tWA {i}: {wa[contextI:i]} <{wa[i]}> {wa[i + 1:i + 11]}",
-                    error=True,
-                )
-                console(
-                    f"\tTF {i}: {tf[contextI:i]} <{tf[i]}> {tf[i + 1:i + 11]}",
-                    error=True,
-                )
+                console(f"\tWA {i}: {wa[contextI:i]} <> {wa[i:i + 10]}", error=True)
+                console(f"\tTF {i}: {tf[contextI:i]} <END>", error=True)
                 different = True
-                break
-
-        if not different and len(wa) > len(tf):
-            i = len(tf)
-            contextI = max((0, i - 10))
-            console(f"\tWA {i}: {wa[contextI:i]} <> {wa[i:i + 10]}", error=True)
-            console(f"\tTF {i}: {tf[contextI:i]} <END>", error=True)
-            different = True
 
         sampleWA = f"{wa[0:20]} ... {wa[-20:]}".replace("\n", " ")
         sampleTF = f"{tf[0:20]} ... {tf[-20:]}".replace("\n", " ")
@@ -1460,6 +1866,35 @@ class WATM:
             console(f"\tTF: {sampleTF:>6}\n\tWA: {sampleWA:>6}")
         return not different
 
+    def featValues(self, feat):
+        """Get the values of a feature as strings, for testing.
+
+        The values are computed once per feature and then kept in the member
+        `valCache`, so that the tests that compare feature values do not convert
+        the same values over and over again.
+
+        Parameters
+        ----------
+        feat: string
+            The name of the feature.
+
+        Returns
+        -------
+        dict
+            Keyed by node, valued by the string representation of the feature value.
+        """
+        valCache = self.valCache
+
+        values = valCache.get(feat, None)
+
+        if values is None:
+            values = {
+                n: None if v is None else str(v) for (n, v) in self.Fs(feat).items()
+            }
+            valCache[feat] = values
+
+        return values
+
     def testAll(self, condensed=False):
         """Test all aspects of the WATM conversion.
 
@@ -1527,6 +1962,8 @@ class WATM:
         We read the WATM dataset and store the tokens in member `testTokens`
         and the annotations in the member `testAnnotations`, and the node mapping
         in the member `nodeFromAid`.
+        The annotations are grouped by kind: `testAnnotations` maps each kind
+        to a list of tuples (aId, body, target), in the order of the aIds.
         We unpack targets if they contain structured information.
         """
 
@@ -1569,7 +2006,7 @@ class WATM:
         # read the text files
 
         skipMeta = self.skipMeta
-        is_metav = self.is_metav
+        metaNodes = self.metaNodes
 
         waSlotTF = {}
         tokenFiles = []
@@ -1577,88 +2014,91 @@ class WATM:
         slot = 1
 
         for tfl, textFile in enumerate(textFiles):
-            with fileOpen(f"{resultDir}/{textFile}") as fh:
-                if asTsv:
+            textPath = f"{resultDir}/{textFile}"
+
+            if asTsv:
+                with fileOpen(textPath) as fh:
                     next(fh)
                     tokens = [
                         t.rstrip("\n").replace("\\t", "\t").replace("\\n", "\n")
                         for t in fh
                     ]
-                else:
-                    text = readJson(asFile=fh, plain=True)
-                    tokens = text["_ordered_segments"]
-
-                tokenFiles.append(tokens)
+            else:
+                text = fromJson(textPath)
+                tokens = text["_ordered_segments"]
 
-                for offset in range(len(tokens)):
-                    while skipMeta and is_metav(slot):
-                        slot += 1
+            tokenFiles.append(tokens)
 
-                    waSlotTF[slot] = (tfl, offset)
+            for offset in range(len(tokens)):
+                while skipMeta and slot in metaNodes:
                     slot += 1
 
+                waSlotTF[slot] = (tfl, offset)
+                slot += 1
+
         self.testTokens = tokenFiles
         self.waSlotTF = waSlotTF
 
         # read the anno files
 
-        annotations = []
+        def readAnnos(annoFile):
+            annoPath = f"{resultDir}/{annoFile}"
 
-        for annoFile in annoFiles:
-            with fileOpen(f"{resultDir}/{annoFile}") as fh:
-                if asTsv:
+            if asTsv:
+                with fileOpen(annoPath) as fh:
                     next(fh)
-                    annos = {}
 
                     for line in fh:
                         (aId, kind, ns, body, target) = line.rstrip("\n").split("\t")
                         body = body.replace("\\t", "\t").replace("\\n", "\n")
-                        annos[aId] = (kind, ns, body, target)
-                else:
-                    annos = readJson(asFile=fh, plain=True)
+                        yield (aId, kind, ns, body, target)
+            else:
+                annos = fromJson(annoPath)
 
                 for aId, (kind, ns, body, target) in annos.items():
-                    if ns == NS_TV:
-                        continue
+                    yield (aId, kind, ns, body, target)
 
-                    if "->" in target:
-                        parts = target.split("->", 1)
-                    else:
-                        parts = [target]
-
-                    newParts = []
-
-                    for part in parts:
-                        if ":" in part:
-                            boundaries = part.split("-", 1)
-                            fb, b = boundaries[0].split(":", 1)
-                            fb = int(fb)
-                            b = int(b)
-
-                            if len(boundaries) == 1:
-                                if kind == KIND_ELEM or kind == KIND_PI:
-                                    part = (int(fb), int(b), int(fb), int(b) + 1)
-                                else:
-                                    part = (int(fb), int(b))
-                            else:
-                                eParts = boundaries[1].split(":", 1)
+        # the tests only look at annotations of specific kinds,
+        # so we group them by kind; they come in aId order already
 
-                                if len(eParts) == 1:
-                                    fe, e = fb, int(eParts[0])
-                                else:
-                                    fe, e = eParts
-                                    fe = int(fe)
-                                    e = int(e)
-                                part = (fb, b, fe, e)
+        annotations = collections.defaultdict(list)
 
-                        newParts.append(part)
+        for annoFile in annoFiles:
+            for aId, kind, ns, body, target in readAnnos(annoFile):
+                if ns == NS_TV:
+                    continue
+
+                if "->" in target:
+                    parts = target.split("->", 1)
+                else:
+                    parts = [target]
+
+                newParts = []
+
+                for part in parts:
+                    match = TARGET_RE.match(part)
+
+                    if match:
+                        (fb, b, fe, e) = match.groups()
+                        fb = int(fb)
+                        b = int(b)
+
+                        if e is None:
+                            if kind == KIND_ELEM or kind == KIND_PI:
+                                part = (fb, b, fb, b + 1)
+                            else:
+                                part = (fb, b)
+                        else:
+                            fe = fb if fe is None else int(fe)
+                            part = (fb, b, fe, int(e))
 
-                    target = newParts[0] if len(newParts) == 1 else tuple(newParts)
+                    newParts.append(part)
 
-                    annotations.append((aId, kind, body, target))
+                target = newParts[0] if len(newParts) == 1 else tuple(newParts)
 
-        annotations = sorted(annotations)
-        self.testAnnotations = annotations
+                annotations[kind].append((aId, body, target))
+
+        self.testAnnotations = dict(annotations)
 
         # read the map files
 
@@ -1699,7 +2139,7 @@ class WATM:
 
         self.console("Testing the text ...")
 
-        nTokensTF = sum(1 if s in waSlotTF else 0 for s in range(1, maxSlotPlus))
+        nTokensTF = sum(1 for s in waSlotTF if s < maxSlotPlus)
         nTokensWA = sum(len(tokens) for tokens in tokenFiles)
         nGood = self.numEqual(nTokensTF, nTokensWA, silent)
 
@@ -1708,10 +2148,18 @@ class WATM:
                 f"{rep(nGood)} - whether the amounts of tokens agree", error=not nGood
             )
 
-        textWA = "".join("".join(tokens) for tokens in tokenFiles)
-        textTF = "".join("".join(text) for text in texts)
+        if textDigest(tokenFiles) == textDigest(texts):
+            tGood = True
+
+            if not silent:
+                sample = textSample(texts)
+                console(f"\tTF: {sample:>6}\n\tWA: {sample:>6}")
+        else:
+            # only now we build the complete texts, to find out where they differ
+            textWA = "".join(chain.from_iterable(tokenFiles))
+            textTF = "".join(chain.from_iterable(texts))
 
-        tGood = self.strEqual(textTF, textWA, silent)
+            tGood = self.strEqual(textTF, textWA, silent)
 
         if not tGood or not silent:
             console(f"{rep(tGood)} - whether the text is the same", error=not tGood)
@@ -1730,8 +2178,9 @@ class WATM:
         boolean
             Whether all these tests succeed.
         """
-        maxSlotPlus = self.maxSlotPlus
-        maxNodePlus = self.maxNodePlus
+        F = self.F
+        otypes = self.otypes
+        slotType = self.slotType
         fotypev = self.fotypev
         eoslots = self.eoslots
         waSlotTF = self.waSlotTF
@@ -1744,30 +2193,35 @@ class WATM:
         nElementsTF = 0
         nPisTF = 0
 
-        for n in range(maxSlotPlus, maxNodePlus):
-            nType = fotypev(n)
-            isPi = nType.startswith("?")
+        # we count per node type, so that we classify each type only once
+        # and do not need to look at the nodes of excluded types at all
 
-            slots = eoslots(n)
-            b = slots[0]
-            e = slots[-1]
+        for nType in otypes:
+            if nType == slotType:
+                continue
 
-            if not (b in waSlotTF and e in waSlotTF):
+            isPi = nType.startswith("?")
+
+            if not isPi and nType in excludeElements:
                 continue
 
+            nNodes = sum(
+                1
+                for slots in map(eoslots, F.otype.s(nType))
+                if slots[0] in waSlotTF and slots[-1] in waSlotTF
+            )
+
             if isPi:
-                nPisTF += 1
+                nPisTF += nNodes
             else:
-                if nType not in excludeElements:
-                    nElementsTF += 1
-
-        nElementsWA = 0
-        nPisWA = 0
+                nElementsTF += nNodes
 
         nodeFromAid = self.nodeFromAid
 
-        nElementsWA = sum(1 if a[1] == KIND_ELEM else 0 for a in annotations)
-        nPisWA = sum(1 if a[1] == KIND_PI else 0 for a in annotations)
+        elemAnnos = annotations.get(KIND_ELEM, [])
+        piAnnos = annotations.get(KIND_PI, [])
+        nElementsWA = len(elemAnnos)
+        nPisWA = len(piAnnos)
 
         eGood = self.numEqual(nElementsTF, nElementsWA, silent)
 
@@ -1790,9 +2244,9 @@ class WATM:
 
         self.console("Testing the element/pi annotations ...")
 
-        element = 0
-        pi = 0
-        other = 0
+        element = nElementsWA
+        pi = nPisWA
+        other = sum(len(x) for x in annotations.values()) - element - pi
         goodName = 0
         wrongName = 0
         unmapped = 0
@@ -1803,58 +2257,51 @@ class WATM:
         allTargets = 0
         goodTargets = 0
 
-        for aId, kind, body, target in annotations:
-            isElem = kind == KIND_ELEM
-            isPi = kind == KIND_PI
-
-            if not (isElem or isPi):
-                other += 1
-                continue
-
-            if isElem:
-                element += 1
-            else:
-                pi += 1
+        nodeOf = nodeFromAid.get
 
-            tag = body
-            node = nodeFromAid.get(aId, None)
+        for kind, isPi, kindAnnos in (
+            (KIND_ELEM, False, elemAnnos),
+            (KIND_PI, True, piAnnos),
+        ):
+            for aId, body, target in kindAnnos:
+                tag = body
+                node = nodeOf(aId, None)
 
-            if node is None:
-                unmapped += 1
-                continue
+                if node is None:
+                    unmapped += 1
+                    continue
 
-            otype = fotypev(node)
+                otype = fotypev(node)
 
-            if isPi and tag == otype[1:] or not isPi and tag == otype:
-                goodName += 1
-            else:
-                wrongName += 1
+                if isPi and tag == otype[1:] or not isPi and tag == otype:
+                    goodName += 1
+                else:
+                    wrongName += 1
 
-            if type(target) is not tuple or len(target) != 4:
-                wrongTargets.append((aId, kind, body, target))
-            else:
-                node = nodeFromAid[aId]
-                slots = eoslots(node)
-                sb = slots[0]
-                se = slots[-1]
-                bTr = waSlotTF.get(sb, None)
-                eTr = waSlotTF.get(se, None)
+                if type(target) is not tuple or len(target) != 4:
+                    wrongTargets.append((aId, kind, body, target))
+                else:
+                    slots = eoslots(node)
+                    sb = slots[0]
+                    se = slots[-1]
+                    bTr = waSlotTF.get(sb, None)
+                    eTr = waSlotTF.get(se, None)
 
-                if eTr is not None:
-                    eTr = (eTr[0], eTr[1] + 1)
+                    if eTr is not None:
+                        eTr = (eTr[0], eTr[1] + 1)
 
-                bWA = (target[0], target[1])
-                eWA = (target[2], target[3])
+                    bWA = (target[0], target[1])
+                    eWA = (target[2], target[3])
 
-                bRep = f"{bWA}" if bTr == bWA else f"{bWA} XX {bTr}"
-                eRep = f"{eWA}" if eTr == eWA else f"{eWA} XX {eTr}"
+                    bRep = f"{bWA}" if bTr == bWA else f"{bWA} XX {bTr}"
+                    eRep = f"{eWA}" if eTr == eWA else f"{eWA} XX {eTr}"
 
-                if bTr is None or eTr is None or bTr != bWA or eTr != eWA:
-                    wrongTargets.append((aId, kind, body, f"{bRep} - {eRep}"))
-                else:
-                    goodTargets += 1
+                    if bTr is None or eTr is None or bTr != bWA or eTr != eWA:
+                        wrongTargets.append((aId, kind, body, f"{bRep} - {eRep}"))
+                    else:
+                        goodTargets += 1
 
-            allTargets += 1
+                allTargets += 1
 
         self.console(f"\tElement      : {element:>6} x")
         self.console(f"\tPi           : {pi:>6} x")
@@ -1917,34 +2364,64 @@ class WATM:
 
         isTei = nsOrig == NS_TEI
 
+        # whether a node is represented in the WATM: its first and last slot
+        # must be mapped; we determine this once for all nodes, one byte per node,
+        # and for attributes the node itself must be mapped as well
+
+        maxSlotPlus = self.maxSlotPlus
+        maxNodePlus = self.maxNodePlus
+
+        keep = bytearray(maxNodePlus)
+
+        for s in waSlotTF:
+            if s < maxSlotPlus:
+                keep[s] = 1
+
+        for n in range(maxSlotPlus, maxNodePlus):
+            slots = eoslots(n)
+
+            if keep[slots[0]] and keep[slots[-1]]:
+                keep[n] = 1
+
+        keepAtt = bytearray(maxNodePlus)
+
+        for n in testNodes:
+            keepAtt[n] = keep[n]
+
         self.console("Testing the attributes ...")
 
         attWA = []
 
-        for aId, kind, body, target in annotations:
-            if kind != KIND_ATTR:
-                continue
+        for aId, body, target in annotations.get(KIND_ATTR, ()):
             if type(target) is tuple and len(target) == 4:
                 target = (target[0], target[1])
             node = nodeFromAid[target]
             att, value = body.split("=", 1)
-            attWA.append((node, att, value))
-
-        attWA = sorted(attWA)
+            attWA.append((node, intern(att), value))
 
         self.console(f"\t{len(attWA)} attribute values")
 
         good = 0
         wrong = []
 
+        # group the values by attribute, so that we fetch the string values of each
+        # feature only once, and look up the nodes in there
+
+        attWAByAtt = {}
+
         for node, att, valWA in attWA:
-            val = Fs(att).v(node)
-            valTF = None if val is None else str(val)
+            attWAByAtt.setdefault(att, []).append((node, valWA))
 
-            if valWA == valTF:
-                good += 1
-            else:
-                wrong.append((node, att, valWA, valTF))
+        for att, items in attWAByAtt.items():
+            fv = self.featValues(att).get
+
+            for node, valWA in items:
+                valTF = fv(node)
+
+                if valWA == valTF:
+                    good += 1
+                else:
+                    wrong.append((node, att, valWA, valTF))
 
         consistent = len(wrong) == 0
 
@@ -1958,7 +2435,10 @@ class WATM:
                 error=not consistent,
             )
 
-        attTF = []
+        # we compare multisets of attribute values, there is no need to sort them
+
+        attTF = collections.Counter()
+        nAttTF = 0
 
         for feat in Fall():
             if feat in TF_SPECIFIC_FEATURES or feat in excludeFeatures:
@@ -1973,25 +2453,17 @@ class WATM:
             ):
                 continue
 
-            for node, valTF in Fs(feat).items():
-                if node not in testNodes:
-                    continue
-
-                slots = eoslots(node)
-                b = slots[0]
-                e = slots[-1]
-
-                if not (b in waSlotTF and e in waSlotTF):
+            for node, valTF in self.featValues(feat).items():
+                if not keepAtt[node]:
                     continue
 
-                attTF.append((node, feat, None if valTF is None else str(valTF)))
-
-        attTF = sorted(attTF)
+                attTF[(node, feat, valTF)] += 1
+                nAttTF += 1
 
         self.console(f"\tWA attributes: {len(attWA)}")
-        self.console(f"\tTF attributes: {len(attTF)}")
+        self.console(f"\tTF attributes: {nAttTF}")
 
-        complete = attTF == attWA
+        complete = attTF == collections.Counter(attWA)
 
         if not complete or not silent:
             console(
@@ -2003,17 +2475,14 @@ class WATM:
 
         fmtWA = []
 
-        for aId, kind, body, target in annotations:
-            if kind != KIND_FMT:
-                continue
+        for aId, body, target in annotations.get(KIND_FMT, ()):
             if body == "note":
                 continue
             if type(target) is tuple and len(target) == 4:
                 target = (target[0], target[1])
             node = nodeFromAid[target]
-            fmtWA.append((node, body))
+            fmtWA.append((node, intern(body)))
 
-        fmtWA = sorted(fmtWA)
         fmtFreqWA = collections.Counter()
 
         for node, body in fmtWA:
@@ -2029,14 +2498,22 @@ class WATM:
         good = 0
         wrong = []
 
+        fmtWAByVal = {}
+
         for node, valWA in fmtWA:
+            fmtWAByVal.setdefault(valWA, []).append(node)
+
+        for valWA, nodes in fmtWAByVal.items():
             feat = f"rend_{valWA}"
-            valTF = valWA if Fs(feat).v(node) else None
+            fv = dict(Fs(feat).items()).get
 
-            if valWA == valTF:
-                good += 1
-            else:
-                wrong.append((node, feat, valWA, valTF))
+            for node in nodes:
+                valTF = valWA if fv(node) else None
+
+                if valWA == valTF:
+                    good += 1
+                else:
+                    wrong.append((node, feat, valWA, valTF))
 
         fconsistent = len(wrong) == 0
 
@@ -2045,7 +2522,7 @@ class WATM:
         if not fconsistent or not silent:
             console(f"\tWrong:    {len(wrong):>5} x")
 
-            for node, feat, valWA, valTF in wrong[0:5]:
+            for node, feat, valWA, valTF in sorted(wrong)[0:5]:
                 console(f"\t\t{node:>6} {feat}:\n", error=True)
                 console(f"\t\t\tTF = «{valTF}»", error=True)
                 console(f"\t\t\tWA = «{valWA}»", error=True)
@@ -2056,7 +2533,8 @@ class WATM:
                 error=not fconsistent,
             )
 
-        fmtTF = []
+        fmtTF = collections.Counter()
+        nFmtTF = 0
 
         for feat in Fall():
             if feat in excludeFeatures:
@@ -2070,21 +2548,16 @@ class WATM:
                 continue
 
             for node, valTF in Fs(feat).items():
-                slots = eoslots(node)
-                b = slots[0]
-                e = slots[-1]
-
-                if not (b in waSlotTF and e in waSlotTF):
+                if not keep[node]:
                     continue
 
-                fmtTF.append((node, value))
-
-        fmtTF = sorted(fmtTF)
+                fmtTF[(node, value)] += 1
+                nFmtTF += 1
 
         self.console(f"\tWA format attributes: {len(fmtWA)}")
-        self.console(f"\tTF format attributes: {len(fmtTF)}")
+        self.console(f"\tTF format attributes: {nFmtTF}")
 
-        fcomplete = fmtTF == fmtWA
+        fcomplete = fmtTF == collections.Counter(fmtWA)
 
         if not fcomplete or not silent:
             console(
@@ -2118,12 +2591,10 @@ class WATM:
 
         attWA = []
 
-        for aId, kind, body, target in annotations:
-            if kind != KIND_ANNO:
-                continue
+        for aId, body, target in annotations.get(KIND_ANNO, ()):
             node = nodeFromAid[target]
             att, value = body.split("=", 1)
-            attWA.append((node, att, value))
+            attWA.append((node, intern(att), value))
 
         attWA = sorted(attWA)
 
@@ -2205,10 +2676,7 @@ class WATM:
 
         tfFromWAEdges = {}
 
-        for aId, kind, body, target in annotations:
-            if kind != KIND_EDGE:
-                continue
-
+        for aId, body, target in annotations.get(KIND_EDGE, ()):
             fro, to = target
             fromNode = nodeFromAid[fro]
             toNode = nodeFromAid[to]
@@ -2223,8 +2691,9 @@ class WATM:
                 console(f"\tFound edge {edge} with {len(edgeData)} starting nodes")
 
         allGood = True
+        edgesTF = frozenset(Eall())
 
-        for edge in set(Eall()) | set(tfFromWAEdges):
+        for edge in edgesTF | set(tfFromWAEdges):
             if edge == OSLOTS or edge in excludeFeatures:
                 continue
 
@@ -2234,7 +2703,7 @@ class WATM:
 
             x = f"edge {edge}: " if silent else "\t\t"
 
-            if edge not in set(Eall()):
+            if edge not in edgesTF:
                 console(f"{x}missing in TF data", error=True)
                 good = False
 
@@ -2247,6 +2716,9 @@ class WATM:
                 allGood = False
                 continue
 
+            # we store the values as strings, as they are in the annotations,
+            # so that we can compare the TF and WA data directly
+
             dataTF = {}
 
             for f, ts in Es(edge).items():
@@ -2257,7 +2729,7 @@ class WATM:
                     for t, v in ts.items():
                         if t not in testNodes:
                             continue
-                        dataTF.setdefault(f, {})[t] = v
+                        dataTF.setdefault(f, {})[t] = None if v is None else str(v)
                 else:
                     for t in ts:
                         if t not in testNodes:
@@ -2266,35 +2738,35 @@ class WATM:
 
             dataWA = tfFromWAEdges[edge]
 
-            fromNodesTF = set(dataTF)
-            fromNodesWA = set(dataWA)
-
-            nFromTF = len(fromNodesTF)
-            nFromWA = len(fromNodesWA)
+            nFromTF = len(dataTF)
+            nFromWA = len(dataWA)
 
-            if fromNodesTF == fromNodesWA:
+            if dataTF.keys() == dataWA.keys():
                 self.console(f"\t\tsame {nFromTF} fromNodes")
             else:
                 console(
                     f"{x}from nodes differ: {nFromTF} in TF, {nFromWA} in WA",
                     error=True,
                 )
+                onlyTF = len(dataTF.keys() - dataWA.keys())
+                onlyWA = len(dataWA.keys() - dataTF.keys())
+                console(
+                    f"{x}\t{onlyTF} only in TF, {onlyWA} only in WA",
+                    error=True,
+                )
                 good = False
 
-            diffs = []
-
-            nToChecked = 0
-
-            for f, toNodeInfoTF in dataTF.items():
-                toNodeInfoWA = dataWA[f]
-                toNodeInfoTF = {
-                    k: None if v is None else str(v) for (k, v) in toNodeInfoTF.items()
-                }
+            nToChecked = sum(len(toNodeInfoTF) for toNodeInfoTF in dataTF.values())
 
-                if toNodeInfoTF != toNodeInfoWA:
-                    diffs.append((f, toNodeInfoTF, toNodeInfoWA))
-
-                nToChecked += len(toNodeInfoTF)
+            diffs = (
+                []
+                if dataTF == dataWA
+                else [
+                    (f, toNodeInfoTF, dataWA.get(f, {}))
+                    for (f, toNodeInfoTF) in dataTF.items()
+                    if toNodeInfoTF != dataWA.get(f, {})
+                ]
+            )
 
             if len(diffs):
                 good = False
@@ -2305,8 +2777,8 @@ class WATM:
                 for f, toNodeInfoTF, toNodeInfoWA in sorted(diffs)[0:10]:
                     console(f"{x}\tfromNode {f}", error=True)
 
-                    toNodesTF = set(toNodeInfoTF)
-                    toNodesWA = set(toNodeInfoWA)
+                    toNodesTF = toNodeInfoTF.keys()
+                    toNodesWA = toNodeInfoWA.keys()
 
                     nToTF = len(toNodesTF)
                     nToWA = len(toNodesWA)
@@ -2355,6 +2827,49 @@ class WATM:
         return allGood
 
 
+def produceDoc(
+    org, repo, backend, nsOrig, skipMeta, extra, silent, prod, resultVersion, doc
+):
+    """Convert a single TF dataset of a corpus that is divided over several datasets.
+
+    This is a function at module level, so that `WATMS.produce` can run it
+    in worker processes.
+
+    Parameters
+    ----------
+    org, repo, backend, nsOrig, skipMeta, extra, silent: any
+        See `WATMS`.
+    prod: boolean
+        See `WATM.writeAll`
+    resultVersion: string
+        See `WATM.writeAll`
+    doc: string
+        Subdirectory where the TF dataset resides.
+
+    Returns
+    -------
+    boolean
+        Whether the conversion and its tests went without errors.
+    """
+    if not silent:
+        console(f"{doc:>5} ... ", newline=False)
+
+    A = use(
+        f"{org}/{repo}:clone",
+        relative=f"/tf/{doc}",
+        checkout="clone",
+        backend=backend,
+        silent=DEEP,
+    )
+    WA = WATM(A, nsOrig, skipMeta=skipMeta, extra=extra, silent=silent, prod=prod)
+    WA.makeText()
+    WA.makeAnno()
+    WA.writeAll(resultVersion=resultVersion)
+    WA.testAll(condensed=True)
+
+    return not WA.error
+
+
 class WATMS:
     """Export corpora that are divided over multiple TF datasets.
 
@@ -2431,6 +2946,7 @@ class WATMS:
         self.console(f"Found {len(docs)} docs in {tfDir}")
 
         self.docs = docs
+        self.docsSorted = sorted(docs, key=lambda x: (x[0], int(x[1:])))
 
     def console(self, msg, **kwargs):
         """Print something to the output.
@@ -2444,9 +2960,12 @@ class WATMS:
         if not silent:
             console(msg, **kwargs)
 
-    def produce(self, doc=None, prod=False):
+    def produce(self, doc=None, prod=False, workers=1):
         """Convert all relevant TF datasets.
 
+        The datasets are converted one after another, in this process,
+        unless you ask for more workers.
+
         Parameters
         ----------
         doc: string, optional None
@@ -2455,6 +2974,14 @@ class WATMS:
             Otherwise all datasets will be converted.
         prod: boolean, optional False
             See `WATM.writeAll`
+        workers: integer, optional 1
+            The maximum number of worker processes.
+            If None or 1, the datasets are converted sequentially in this process.
+            Otherwise they are converted in parallel by a pool of that many worker
+            processes. Every worker loads a complete TF dataset, so mind the memory
+            of your machine. The console output of the workers will be interleaved,
+            and on systems that spawn processes (macOS, Windows) the calling
+            script needs an `if __name__ == "__main__":` guard.
         """
         error = self.error
         silent = self.silent
@@ -2469,7 +2996,7 @@ class WATMS:
         nsOrig = self.nsOrig
         skipMeta = self.skipMeta
         extra = self.extra
-        docs = self.docs
+        docsSorted = self.docsSorted
         silent = self.silent
         repoDir = self.repoDir
         tfVersion = self.tfVersion
@@ -2478,31 +3005,33 @@ class WATMS:
 
         resultVersion = getResultDir(repoDir, "", tfVersion, prod, silent)
 
-        good = True
-
-        for doc in sorted(docs, key=lambda x: (x[0], int(x[1:]))):
-            if chosenDoc is not None and chosenDoc != doc:
-                continue
+        chosenDocs = [
+            doc
+            for doc in docsSorted
+            if chosenDoc is None or chosenDoc == doc
+        ]
 
-            self.console(f"{doc:>5} ... ", newline=False)
+        produceOne = partial(
+            produceDoc,
+            org,
+            repo,
+            backend,
+            nsOrig,
+            skipMeta,
+            extra,
+            silent,
+            prod,
+            resultVersion,
+        )
 
-            A = use(
-                f"{org}/{repo}:clone",
-                relative=f"/tf/{doc}",
-                checkout="clone",
-                backend=backend,
-                silent=DEEP,
-            )
-            WA = WATM(
-                A, nsOrig, skipMeta=skipMeta, extra=extra, silent=silent, prod=prod
-            )
-            WA.makeText()
-            WA.makeAnno()
-            WA.writeAll(resultVersion=resultVersion)
-            WA.testAll(condensed=True)
+        if workers is None or workers <= 1:
+            good = all([produceOne(doc) for doc in chosenDocs])
+        else:
+            # the datasets are independent of each other,
+            # so we can convert them in parallel processes
 
-            if WA.error:
-                good = False
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                good = all(list(pool.map(produceOne, chosenDocs)))
 
         if not silent or error:
             console(f"WATM generation: {rep(good)}", error=not good)
@@ -2,7 +2,10 @@ import os
 import json
 import yaml
 
+from copy import deepcopy
+from functools import lru_cache
 from shutil import rmtree, copytree, copy
+from stat import S_ISDIR, S_ISREG
 
 from ..parameters import (
     ON_IPAD,
@@ -34,6 +37,13 @@ def str_presenter(dumper, data):
 yaml.add_representer(str, str_presenter)
 yaml.representer.SafeRepresenter.add_representer(str, str_presenter)
 
+YAML_LOADER = getattr(yaml, "CFullLoader", yaml.FullLoader)
+"""The loader for YAML data.
+
+We use the loader on top of the libyaml C parser if PyYAML has been built with it,
+otherwise the pure Python loader. Both construct the same data.
+"""
+
 
 def fileOpen(*args, **kwargs):
     """Wrapper around `open()`, making sure `encoding="utf8" is passed.
@@ -48,11 +58,29 @@ def fileOpen(*args, **kwargs):
     return open(*args, **kwargs, encoding="utf8")
 
 
+@lru_cache(maxsize=4096)
 def normpath(path):
     if path is None:
         return None
-    norm = os.path.normpath(path)
-    return "/".join(norm.split(os.path.sep))
+
+    # on POSIX, a path without empty, `.` and `..` steps and without a trailing
+    # slash is already normalized
+
+    if (
+        os.sep == "/"
+        and type(path) is str
+        and path
+        and "//" not in path
+        and "/./" not in path
+        and ".." not in path
+        and not path.startswith("./")
+        and not path.endswith("/.")
+        and path != "."
+        and (path == "/" or not path.endswith("/"))
+    ):
+        return path
+
+    return os.path.normpath(path).replace(os.sep, "/")
 
 
 _tildeDir = normpath(os.path.expanduser("~"))
@@ -69,6 +97,7 @@ def abspath(path):
     return normpath(os.path.abspath(path))
 
 
+@lru_cache(maxsize=4096)
 def expanduser(path):
     nPath = normpath(path)
     if nPath.startswith("~"):
@@ -77,11 +106,15 @@ def expanduser(path):
     return nPath
 
 
+@lru_cache(maxsize=4096)
 def unexpanduser(path):
     nPath = normpath(path)
     # if nPath.startswith(_homeDir):
     #    return f"~{nPath[len(_homeDir):]}"
 
+    if _homeDir not in nPath:
+        return nPath
+
     return nPath.replace(_homeDir, "~")
 
 
@@ -151,19 +184,35 @@ def getLocation(targetDir=None):
         return (None, None, None, None)
 
     destDir = destDir.removeprefix("~/")
-    parts = destDir.split("/")
 
-    if len(parts) == 1:
-        return (parts[0], None, None, None)
-    if len(parts) == 2:
-        return (parts[0], parts[1], None, None)
-    if len(parts) in {2, 3}:
-        return (parts[0], parts[1], parts[2], "")
+    # we locate the first three slashes and slice around them
+
+    p1 = destDir.find("/")
+    if p1 < 0:
+        return (destDir, None, None, None)
+
+    p2 = destDir.find("/", p1 + 1)
+    if p2 < 0:
+        return (destDir[0:p1], destDir[p1 + 1 :], None, None)
+
+    backend = destDir[0:p1]
+    org = destDir[p1 + 1 : p2]
+
+    p3 = destDir.find("/", p2 + 1)
+    if p3 < 0:
+        return (backend, org, destDir[p2 + 1 :], "")
+
+    repo = destDir[p2 + 1 : p3]
+
+    # the relative part leaves out the last component;
+    # it starts with the slash after the repo, if it is not empty
 
-    relative = prefixSlash("/".join(parts[3:-1]))
-    return (parts[0], parts[1], parts[2], relative)
+    pL = destDir.rfind("/")
+    relative = destDir[p3:pL] if pL > p3 else ""
+    return (backend, org, repo, relative)
 
 
+@lru_cache(maxsize=256)
 def backendRep(be, kind, default=None):
     """Various back-end dependent values.
 
@@ -221,7 +270,6 @@ def backendRep(be, kind, default=None):
         if be in {GL, f"{GL}.com"}
         else be
     )
-    beTail = ".".join(be.split(".")[1:])
 
     if kind == "norm":
         return be
@@ -269,6 +317,7 @@ def backendRep(be, kind, default=None):
         return f"{URL_NB}/{be}"
 
     if kind == "pages":
+        beTail = ".".join(be.split(".")[1:])
         return f"{GH}.io" if be == GH else f"{GL}.io" if be == GL else f"pages.{beTail}"
     return None
 
@@ -421,21 +470,17 @@ def clearTree(path):
         home directory.
     """
 
-    subdirs = []
-    path = expanduser(path)
-
-    with os.scandir(path) as dh:
-        for (i, entry) in enumerate(dh):
-            name = entry.name
-            if name.startswith("."):
-                continue
-            if entry.is_file():
-                os.remove(f"{path}/{name}")
-            elif entry.is_dir():
-                subdirs.append(name)
+    stack = [expanduser(path)]
 
-    for subdir in subdirs:
-        clearTree(f"{path}/{subdir}")
+    while stack:
+        with scanDir(stack.pop()) as dh:
+            for entry in dh:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_file():
+                    os.remove(entry.path)
+                elif entry.is_dir():
+                    stack.append(entry.path)
 
 
 def initTree(path, fresh=False, gentle=False):
@@ -492,9 +537,8 @@ def extNm(path):
 
 def stripExt(path):
     """Strip the extension of a file name, if there is one."""
-    (d, f) = (dirNm(path), fileNm(path))
-    sep = "/" if d else ""
-    return f"{d}{sep}{f.rsplit('.', 1)[0]}"
+    dot = path.rfind(".")
+    return path[0:dot] if dot > path.rfind("/") else path
 
 
 def replaceExt(path, newExt):
@@ -508,6 +552,23 @@ def splitPath(path):
     return os.path.split(path)
 
 
+def statPath(path):
+    """Get the status of a path, following symbolic links.
+
+    Use this if you need to know several things of the same path: it costs only
+    one system call.
+
+    Returns
+    -------
+    os.stat_result | None
+        None if the path does not exist or cannot be inspected.
+    """
+    try:
+        return os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+
 def isFile(path):
     """Whether path exists and is a file."""
     return os.path.isfile(path)
@@ -583,13 +644,16 @@ def dirCopy(pathSrc, pathDst, noclobber=False):
     """Copies a directory if it exists as directory.
 
     Wipes the destination directory, if it exists.
+
+    The files are copied with their permission bits, but not with their other
+    metadata, such as access and modification times.
     """
     if dirExists(pathSrc):
         if dirExists(pathDst):
             if noclobber:
                 return False
-        dirRemove(pathDst)
-        copytree(pathSrc, pathDst)
+            rmtree(pathDst)
+        copytree(pathSrc, pathDst, copy_function=copy)
         return True
     else:
         return False
@@ -626,11 +690,15 @@ def dirContents(path):
     files = []
     dirs = []
 
-    for entry in os.listdir(path):
-        if os.path.isfile(f"{path}/{entry}"):
-            files.append(entry)
-        elif os.path.isdir(f"{path}/{entry}"):
-            dirs.append(entry)
+    # the directory entries of scandir know their type, so we do not need to
+    # stat each entry again
+
+    with scanDir(path) as dh:
+        for entry in dh:
+            if entry.is_file():
+                files.append(entry.name)
+            elif entry.is_dir():
+                dirs.append(entry.name)
 
     return (tuple(files), tuple(dirs))
 
@@ -656,10 +724,15 @@ def dirAllFiles(path, ignore=None):
         The names of the files under `path`, starting with `path`, followed
         by the bit relative to `path`.
     """
-    if fileExists(path):
+    # we need to know whether path is a file or a directory: one stat suffices
+
+    st = statPath(path)
+    mode = 0 if st is None else st.st_mode
+
+    if S_ISREG(mode):
         return [path]
 
-    if not dirExists(path):
+    if not S_ISDIR(mode):
         return []
 
     files = []
@@ -667,15 +740,26 @@ def dirAllFiles(path, ignore=None):
     if not ignore:
         ignore = set()
 
-    for entry in os.listdir(path):
-        name = f"{path}/{entry}"
+    # we walk the tree with a stack of directories instead of recursion;
+    # the directory entries of scandir know their type, so we do not need to
+    # stat each entry again; we only collect real files (following symlinks),
+    # not dangling links, fifos or sockets
+
+    stack = [path]
 
-        if os.path.isfile(name):
-            files.append(name)
-        elif os.path.isdir(name):
-            if entry in ignore:
-                continue
-            files.extend(dirAllFiles(name, ignore=ignore))
+    while stack:
+        thisPath = stack.pop()
+
+        with scanDir(thisPath) as dh:
+            for entry in dh:
+                name = f"{thisPath}/{entry.name}"
+
+                if entry.is_file():
+                    files.append(name)
+                elif entry.is_dir():
+                    if entry.name in ignore:
+                        continue
+                    stack.append(name)
 
     return tuple(sorted(files))
 
@@ -781,6 +865,17 @@ def writeJson(data, asFile=None, **kwargs):
         asFile.write(dumped)
 
 
+@lru_cache(maxsize=128)
+def _readYamlFile(path, mTimeNs, size):
+    """Parse a YAML file, memoized by path, modification time and size.
+
+    The modification time and size are only part of the cache key: when a file
+    changes on disk, it will be parsed again.
+    """
+    with fileOpen(path) as fh:
+        return yaml.load(fh, Loader=YAML_LOADER)
+
+
 def readYaml(text=None, plain=False, asFile=None, preferTuples=True):
     """Read a YAML file or string.
 
@@ -807,16 +902,23 @@ def readYaml(text=None, plain=False, asFile=None, preferTuples=True):
     object
         The resulting data structure.
     """
-    kwargs = dict(Loader=yaml.FullLoader)
-
     if asFile is None:
-        cfg = yaml.load(text, **kwargs)
+        cfg = yaml.load(text, Loader=YAML_LOADER)
     else:
-        if fileExists(asFile):
-            with fileOpen(asFile) as fh:
-                cfg = yaml.load(fh, **kwargs)
-        else:
+        # one stat tells whether the file exists and gives its cache key
+
+        st = statPath(asFile)
+
+        if st is None or not S_ISREG(st.st_mode):
             cfg = {}
+        else:
+            # the parsed data is shared between calls, so we hand out copies only;
+            # deepAttrDict makes a fresh copy of all containers anyway
+
+            cfg = _readYamlFile(asFile, st.st_mtime_ns, st.st_size)
+
+            if plain:
+                cfg = deepcopy(cfg)
 
     return cfg if plain else deepAttrDict(cfg, preferTuples=preferTuples)
 